@@ -0,0 +1,440 @@
+# src/bench.py
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import contextlib
+import subprocess
+import resource
+import tempfile
+import multiprocessing
+from console import console
+from rich.table import Table
+
+def _peak_rss_kb():
+    """Piek-RSS van dit proces in KB (macOS rapporteert bytes)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def _load_json_cache(path, words):
+    with open(path, 'r', encoding='utf-8') as f:
+        word_db = json.load(f)
+    return sum(len(word_db.get(word, [])) for word in words)
+
+def _load_binary_cache(path, words):
+    from worddb import WordDatabase
+    word_db = WordDatabase(path)
+    return sum(len(word_db.clips(word)) for word in words)
+
+def _measure(loader, path, words, queue):
+    """Draait in een vers proces, zodat laadtijd en RSS niet door eerdere runs vertekend worden."""
+    rss_before = _peak_rss_kb()
+    start = time.perf_counter()
+    found = loader(path, words)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, _peak_rss_kb() - rss_before, found))
+
+def _run_isolated(loader, path, words):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(loader, path, words, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def bench_word_database(root_dir, sentence, repeat=3):
+    """
+    Vergelijkt de oude word_database.json cache met de binaire woorden-database:
+    laadtijd plus opzoeken van de woorden uit `sentence`, en de extra piek-RSS.
+    """
+    from parser import build_word_database
+    from worddb import open_word_database, word_db_path
+
+    words = sentence.lower().split()
+    open_word_database(root_dir).close()
+    word_db = build_word_database(root_dir)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'word_database.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(word_db, f)
+        del word_db
+
+        candidates = [
+            ('JSON (word_database.json)', _load_json_cache, json_path),
+            ('Binair (word_database.bin)', _load_binary_cache, word_db_path(root_dir)),
+        ]
+        table = Table(title=f"Woorden-database laden voor '{sentence}'")
+        for column in ("Formaat", "Bestand", "Laadtijd (beste)", "Extra RSS", "Voorkomens"):
+            table.add_column(column)
+        results = []
+        for label, loader, path in candidates:
+            runs = [_run_isolated(loader, path, words) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run[0])
+            size_mb = os.path.getsize(path) / 1e6
+            results.append({'format': label, 'size_mb': size_mb, 'seconds': best[0],
+                            'rss_kb': best[1], 'found': best[2]})
+            table.add_row(label, f"{size_mb:.1f} MB", f"{best[0] * 1000:.1f} ms",
+                          f"{best[1] / 1024:.1f} MB", str(best[2]))
+    console.print(table)
+    return results
+
+def _reference_scan_words(json_files, search_terms):
+    """De woord-scan zoals hij was: volledige json.load en per venster opnieuw normaliseren."""
+    from transcript import normalize_word
+    found = 0
+    for json_path in json_files:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            try: data = json.load(f)
+            except json.JSONDecodeError: continue
+        all_words = [word for segment in data.get('segments', []) for word in segment.get('words', [])]
+        for term in search_terms:
+            phrase_words = term.lower().split()
+            for i in range(len(all_words) - len(phrase_words) + 1):
+                json_phrase_words = [normalize_word(w.get('word', '')) for w in all_words[i:i+len(phrase_words)]]
+                if json_phrase_words == phrase_words:
+                    if 'start' in all_words[i] and 'end' in all_words[i + len(phrase_words) - 1]:
+                        found += 1
+    return found
+
+def bench_scan(root_dir, search_terms, repeat=3, jobs=None):
+    """
+    Meet de woord-scan zonder index over alle transcripties onder root_dir: de oude
+    aanpak, de nieuwe zonder sidecars (JSON parsen, één keer normaliseren, één doorloop)
+    en de nieuwe met de `.woorden` sidecars, op één core en verdeeld over `jobs` processen.
+    """
+    import parser
+    from indexer import find_transcripts
+    from transcript import video_path_for
+
+    json_files = [path for path in find_transcripts(root_dir) if os.path.exists(video_path_for(path))]
+    # De scan zelf mag niets printen; alleen de tabel telt.
+    console.quiet = True
+    candidates = [
+        ('Oud (json.load, per venster)', lambda: _reference_scan_words(json_files, search_terms)),
+        ('Nieuw, zonder sidecar', lambda: len(parser._scan_words(json_files, search_terms, cache=False, jobs=1))),
+        ('Nieuw, met sidecar', lambda: len(parser._scan_words(json_files, search_terms, cache=True, jobs=1))),
+    ]
+    # Eén run vooraf, zodat de sidecars bestaan en de bestanden in de page cache staan.
+    candidates[2][1]()
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1:
+        candidates += [
+            (f'Nieuw, zonder sidecar, {jobs} processen',
+             lambda: len(parser._scan_words(json_files, search_terms, cache=False, jobs=jobs))),
+            (f'Nieuw, met sidecar, {jobs} processen',
+             lambda: len(parser._scan_words(json_files, search_terms, cache=True, jobs=jobs))),
+        ]
+
+    table = Table(title=f"Woord-scan zonder index: {len(json_files)} transcripties, {len(search_terms)} term(en)")
+    for column in ("Methode", "Tijd (beste)", "Per bestand", "Hits", "Versnelling"):
+        table.add_column(column)
+    results = []
+    for label, run in candidates:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = run()
+            timings.append(time.perf_counter() - start)
+        results.append({'method': label, 'seconds': min(timings), 'found': found})
+    console.quiet = False
+    baseline = results[0]['seconds']
+    for result in results:
+        table.add_row(result['method'], f"{result['seconds']:.2f} s",
+                      f"{result['seconds'] / max(len(json_files), 1) * 1000:.2f} ms", str(result['found']),
+                      f"{baseline / result['seconds']:.1f}x")
+    console.print(table)
+    return results
+
+SUITE_SIZES = (25, 100, 400)
+SUITE_RESULTS_FILE = 'bench_resultaten.jsonl'
+# Mediaan van de echte transcripties: ~2850 woorden in ~350 segmenten, ~0,18 s per woord.
+SUITE_WORDS_PER_TRANSCRIPT = 2850
+SUITE_TRANSCRIPTS_PER_DIR = 50
+# Woorden die altijd in de vocabulaire zitten (vooraan, dus vaak), zodat de zeg-zin altijd kan.
+_COMMON_WORDS = ('de het een en ik je is dat niet die van op te in wat ja nee maar we er zijn '
+                 'met voor dan hij ze was nou heb gewoon jongen hallo allemaal welkom dumpert reten '
+                 'reet kut vijf twee drie man echt even lekker zeg').split()
+_SYLLABLES = ('ka ke ki ko ku ba be bo da de do ga go ha he ho ja jo la le lo ma me mo na ne no pa pe po '
+              'ra re ro sa se so ta te to va ve vo wa we zo sch str oe ie ij ui eu aa ee oo uu').split()
+
+def _synthetic_vocabulary(rng, size):
+    """Nederlands-achtige nepwoorden achter de vaste woorden, uniek en in willekeurige volgorde."""
+    vocabulary = list(_COMMON_WORDS)
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(_SYLLABLES, size=rng.integers(1, 5)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+def _synthetic_transcript(rng, vocabulary, probabilities, n_words):
+    """Een WhisperX-achtige transcriptie: segmenten met woorden, tijden, scores en leestekens."""
+    picks = rng.choice(len(vocabulary), size=n_words, p=probabilities)
+    durations = rng.gamma(2.0, 0.09, size=n_words) + 0.04
+    segments, word_segments, t, i = [], [], rng.uniform(0.5, 3.0), 0
+    while i < n_words:
+        length = min(int(rng.poisson(7)) + 1, n_words - i)
+        words = []
+        for k in range(length):
+            text = vocabulary[picks[i + k]]
+            if k == 0:
+                text = text.capitalize()
+            if k == length - 1:
+                text += '?' if rng.random() < 0.15 else '.'
+            word = {'word': text}
+            # WhisperX geeft getallen en sommige losse woorden geen tijden.
+            if rng.random() > 0.01:
+                word.update(start=round(t, 3), end=round(t + durations[i + k], 3),
+                            score=round(float(rng.uniform(0.2, 1.0)), 3))
+            t += durations[i + k] + float(rng.uniform(0.02, 0.12))
+            words.append(word)
+        timed = [word for word in words if 'start' in word]
+        segment_start = timed[0]['start'] if timed else round(t, 3)
+        segment_end = timed[-1]['end'] if timed else round(t, 3)
+        segments.append({'start': segment_start, 'end': segment_end,
+                         'text': ' ' + ' '.join(word['word'] for word in words), 'words': words})
+        word_segments.extend(words)
+        t += float(rng.uniform(0.2, 1.5))
+        i += length
+    return {'segments': segments, 'word_segments': word_segments, 'language': 'nl'}, t
+
+def _make_test_video(path, seconds, loop_seconds=30):
+    """
+    Een kleine testvideo (testbeeld plus toon) van `seconds` lang. Alleen de eerste
+    `loop_seconds` worden echt ge-encodeerd; de rest is die lus, aan elkaar gekopieerd.
+    """
+    loop_path = f"{path}.lus.mp4"
+    subprocess.run([
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size=320x180:rate=10:duration={loop_seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={loop_seconds}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-g', '20',
+        '-c:a', 'aac', '-ac', '2', loop_path
+    ], check=True)
+    subprocess.run([
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-stream_loop', '-1', '-i', loop_path,
+        '-t', f"{seconds:.0f}", '-c', 'copy', path
+    ], check=True)
+    os.remove(loop_path)
+
+def generate_corpus(root_dir, n_transcripts, words_per_transcript=SUITE_WORDS_PER_TRANSCRIPT, seed=0):
+    """
+    Schrijft een synthetische bibliotheek onder root_dir: `n_transcripts` WhisperX JSON's
+    (woordfrequenties volgens Zipf) in mappen van SUITE_TRANSCRIPTS_PER_DIR, elk met een .mp4
+    ernaast. Alle .mp4's zijn hardlinks naar één testvideo die lang genoeg is voor de langste
+    transcriptie. Geeft de paden van de transcripties terug.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    # Zoveel unieke woorden als de echte bibliotheek per transcriptie ongeveer oplevert.
+    vocabulary = _synthetic_vocabulary(rng, max(2000, n_transcripts * 110))
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.05
+    probabilities = weights / weights.sum()
+
+    json_files, longest = [], 0.0
+    for i in range(n_transcripts):
+        subdir = os.path.join(root_dir, f"kanaal_{i // SUITE_TRANSCRIPTS_PER_DIR:03d}")
+        os.makedirs(subdir, exist_ok=True)
+        n_words = max(1, int(rng.normal(words_per_transcript, words_per_transcript * 0.3)))
+        data, duration = _synthetic_transcript(rng, vocabulary, probabilities, n_words)
+        json_path = os.path.join(subdir, f"aflevering_{i:05d}.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        json_files.append(json_path)
+        longest = max(longest, duration)
+
+    master = os.path.join(root_dir, 'testvideo.bin')
+    _make_test_video(master + '.mp4', longest + 2)
+    os.replace(master + '.mp4', master)
+    for json_path in json_files:
+        video_path = json_path.replace('.json', '.mp4')
+        try:
+            os.link(master, video_path)
+        except OSError:
+            shutil.copyfile(master, video_path)
+    return json_files
+
+def _suite_terms(json_files):
+    """Zoektermen die zeker voorkomen: een zin uit de eerste transcriptie en een los woord."""
+    from transcript import read_transcript
+    transcript = read_transcript(json_files[0], cache=False)
+    words = [word for word in transcript.words if word]
+    middle = len(words) // 2
+    return [' '.join(words[middle:middle + 2]), words[len(words) // 3]]
+
+def _git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _previous_run(path, params):
+    """De laatste eerdere run in het resultatenbestand met dezelfde instellingen, of None."""
+    previous = None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try: run = json.loads(line)
+                except json.JSONDecodeError: continue
+                if run.get('params') == params:
+                    previous = run
+    except OSError:
+        return None
+    return previous
+
+def _timed(step, size, run, results, repeat=1):
+    """Voert `run` `repeat` keer uit met alle uitvoer weggevangen, en bewaart de beste tijd."""
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            value = run()
+            timings.append(time.perf_counter() - start)
+    items = len(value) if hasattr(value, '__len__') else None
+    results.append({'size': size, 'step': step, 'seconds': min(timings), 'items': items})
+    return value
+
+def _run_suite_size(size, words_per_transcript, render_clips, repeat, seed, results):
+    """Alle metingen voor één corpusgrootte, in de huidige map (die de projectroot speelt)."""
+    import parser
+    from indexer import open_index
+    from worddb import open_word_database
+    from planner import plan_sentences, max_sentences
+    from compiler import create_supercut
+
+    json_files = _timed('corpus genereren', size, lambda: generate_corpus('videos', size, words_per_transcript, seed), results)
+    terms = _suite_terms(json_files)
+    sentence = ['hallo', 'allemaal', 'en', 'welkom']
+
+    _timed('index (koud)', size, lambda: open_index('videos').close(), results)
+    _timed('build_word_database', size, lambda: parser.build_word_database('videos'), results)
+    word_db = _timed('word_database.bin (koud)', size, lambda: open_word_database('videos'), results)
+    _timed('zoek (index)', size, lambda: parser.find_phrases('videos', terms), results, repeat)
+    clips = _timed('kut (index)', size, lambda: parser.find_precise_clips('videos', terms), results, repeat)
+    _timed('kut (scan, zonder sidecar)', size,
+           lambda: parser._scan_precise_clips(json_files, terms, cache=False, jobs=1), results)
+    _timed('kut (scan, met sidecar)', size,
+           lambda: parser._scan_precise_clips(json_files, terms, cache=True, jobs=1), results, repeat)
+    n = min(100, max_sentences(word_db, sentence))
+    _timed(f'zeg plan ({n} zinnen)', size, lambda: plan_sentences(word_db, sentence, n, seed=seed), results, repeat)
+    word_db.close()
+
+    if render_clips and clips:
+        selection = clips[:render_clips]
+        for engine in ('per-clip', 'enkel', 'stream'):
+            _timed(f'render {engine} ({len(selection)} clips)', size,
+                   lambda: create_supercut(selection, output_filename='bench.mp4', use_cache=False,
+                                           render_engine=engine), results)
+
+def bench_suite(sizes=SUITE_SIZES, words_per_transcript=SUITE_WORDS_PER_TRANSCRIPT, render_clips=6, repeat=3,
+                output=SUITE_RESULTS_FILE, seed=0, keep=False):
+    """
+    Genereert per grootte een synthetische bibliotheek in een eigen tijdelijke map en meet
+    daarop het bouwen van de index en woorden-database, elke zoekmethode, het zeg-plan en
+    het renderen. De resultaten komen als één JSON-regel per run achteraan `output`, met de
+    git-commit erbij, zodat versies naast elkaar gelegd kunnen worden; de tabel toont ook
+    het verschil met de vorige run met dezelfde instellingen.
+    """
+    import platform
+
+    output = os.path.abspath(output)
+    params = {'sizes': list(sizes), 'words_per_transcript': words_per_transcript,
+              'render_clips': render_clips, 'repeat': repeat, 'seed': seed}
+    previous = _previous_run(output, params)
+    results = []
+    project_root = os.getcwd()
+    for size in sizes:
+        work_dir = tempfile.mkdtemp(prefix=f"dumpert-bench-{size}-")
+        console.print(f"-> Corpus van [cyan]{size}[/cyan] transcripties in {work_dir}...")
+        os.chdir(work_dir)
+        try:
+            _run_suite_size(size, words_per_transcript, render_clips, repeat, seed, results)
+        finally:
+            os.chdir(project_root)
+            if not keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': _git_commit(),
+           'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+           'params': params, 'results': results}
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run) + '\n')
+
+    before = {(r['size'], r['step']): r['seconds'] for r in previous['results']} if previous else {}
+    title = "Benchmark-suite op een synthetische bibliotheek"
+    if previous:
+        title += f" (t.o.v. {previous.get('commit') or '?'} van {previous['timestamp']})"
+    table = Table(title=title)
+    for column in ("Transcripties", "Stap", "Tijd", "Resultaten", "Verschil"):
+        table.add_column(column)
+    for result in results:
+        old = before.get((result['size'], result['step']))
+        change = f"{(result['seconds'] - old) / old * 100:+.0f}%" if old else "-"
+        table.add_row(str(result['size']), result['step'], f"{result['seconds'] * 1000:.1f} ms",
+                      "" if result['items'] is None else str(result['items']), change)
+    console.print(table)
+    console.print(f"--> [bold green]✓ Resultaten toegevoegd aan {output}[/bold green]")
+    return run
+
+STARTUP_BUDGET_MS = 250
+STARTUP_COMMANDS = (['--help'], ['zeg', '--help'], ['kut', '--help'], ['bench', '--help'])
+# Deze horen bij de commando's zelf; als `--help` ze laadt, is er ergens een import naar boven gekropen.
+HEAVY_MODULES = ('numpy', 'asyncio', 'compiler', 'parser', 'planner', 'fuzzy', 'worddb', 'indexer',
+                 'transcriber', 'downloader', 'rich.live', 'rich.progress')
+
+def _startup_imports(cli_path, args):
+    """Top-level imports van één opstart met `-X importtime`, als {module: eigen+kinderen in ms}."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', cli_path, *args],
+                               capture_output=True, text=True)
+    imports = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = int(cumulative) / 1000
+    return imports
+
+def bench_startup(args_list=STARTUP_COMMANDS, repeat=10, budget_ms=STARTUP_BUDGET_MS):
+    """
+    Meet hoe lang `dumpert` nodig heeft om op te starten: elk commando `repeat` keer als
+    los proces, waarvan de beste tijd telt. Laat ook zien welke imports het meest kosten en
+    of er zware modules meekomen. Geeft False als een commando boven `budget_ms` uitkomt
+    of een zware module laadt, zodat dit als controle in een script kan draaien.
+    """
+    cli_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    table = Table(title=f"Opstarttijd van dumpert (budget {budget_ms} ms)")
+    for column in ("Commando", "Beste", "Mediaan", "Zware modules", "Binnen budget"):
+        table.add_column(column)
+    ok = True
+    for args in args_list:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, cli_path, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        imports = _startup_imports(cli_path, args)
+        heavy = [module for module in HEAVY_MODULES if module in imports]
+        within = timings[0] <= budget_ms and not heavy
+        ok = ok and within
+        table.add_row(' '.join(args), f"{timings[0]:.0f} ms", f"{timings[len(timings) // 2]:.0f} ms",
+                      ', '.join(heavy) or "-", "[green]ja[/green]" if within else "[red]nee[/red]")
+    console.print(table)
+
+    # De import-tijden van `--help` per module die rechtstreeks door cli geladen wordt.
+    imports = _startup_imports(cli_path, list(args_list[0]))
+    top = sorted(((name, ms) for name, ms in imports.items() if '.' not in name and not name.startswith('_')),
+                 key=lambda item: -item[1])[:8]
+    console.print("Duurste imports: " + ', '.join(f"{name} {ms:.0f} ms" for name, ms in top))
+    if ok:
+        console.print(f"--> [bold green]✓ Alle commando's starten binnen {budget_ms} ms.[/bold green]")
+    else:
+        console.print(f"[bold red]Fout: Opstarten overschrijdt het budget van {budget_ms} ms of laadt zware modules.[/bold red]")
+    return ok
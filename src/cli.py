@@ -3,15 +3,18 @@ import os
 import time 
 import click
 import logging 
-import random
-from rich.live import Live
-from rich.console import Console 
-from compiler import create_supercut
-from downloader import download_video
-from transcriber import transcribe_path
-from parser import find_phrases, build_word_database, find_precise_clips
+import logging.handlers
+from collections import Counter
+from console import console
+from server import query
+import metrics
 
-console = Console(force_terminal=True)
+# De commando-modules (compiler, parser, planner, ...) en hun zware afhankelijkheden zoals
+# numpy worden pas in het commando zelf geïmporteerd: `--help` of een `zeg` die door een
+# draaiende `serve` beantwoord wordt hoeft ze nooit te laden. `bench opstart` bewaakt dat.
+RENDER_ENGINES = ('auto', 'per-clip', 'enkel', 'stream')
+LOG_MAX_BYTES = 5 * 1024 ** 2
+LOG_BACKUPS = 3
 
 def parse_limit_range(limit_str: str | None) -> tuple[int | None, int | None]:
     """
@@ -44,22 +47,59 @@ def parse_limit_range(limit_str: str | None) -> tuple[int | None, int | None]:
         console.print(f"[bold red]Fout: Ongeldig limiet-formaat '{limit_str}'. Gebruik 'N', 'start;eind' of ';eind'[/bold red]")
         return None, None
     
+def find_variants(directory, words, limit=None, word_db=None):
+    """Varianten per woord uit de vocabulaire, van een draaiende `serve` of anders uit de lokale fuzzy-index."""
+    from fuzzy import open_fuzzy_index, FUZZY_VARIANTS
+    limit = limit or FUZZY_VARIANTS
+    variants = query('varianten', directory, words=words, limit=limit)
+    if variants is None:
+        from worddb import open_word_database
+        fuzzy_index = open_fuzzy_index(word_db or open_word_database(directory))
+        variants = {word: fuzzy_index.similar(word, limit=limit) for word in words}
+    return variants
+
 def setup_logging():
     """Configureert logging om naar een bestand te schrijven."""
+    # Aanvullen: een `serve` en losse commando's schrijven tegelijk naar hetzelfde bestand.
+    # Boven LOG_MAX_BYTES schuift het door naar log.txt.1 .. log.txt.N, zodat het niet eindeloos groeit.
+    handler = logging.handlers.RotatingFileHandler('log.txt', mode='a', maxBytes=LOG_MAX_BYTES,
+                                                   backupCount=LOG_BACKUPS, encoding='utf-8')
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
-        filename='log.txt',
-        filemode='w'
+        handlers=[handler]
     )
-    
+
+def setup_profiling(ctx, profile, cprofile_path):
+    """Zet na afloop van het commando de tijd per fase op het scherm en/of een cProfile-dump weg."""
+    profiler = None
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            console.print(f"-> cProfile-dump opgeslagen als [cyan]{cprofile_path}[/cyan] "
+                          f"(bekijk met: python -m pstats {cprofile_path})")
+        if profile:
+            metrics.print_report()
+    ctx.call_on_close(finish)
+
 @click.group()
-def cli():
+@click.option('--profile', is_flag=True, help='Toon na afloop hoeveel tijd er in elke fase ging.')
+@click.option('--cprofile', 'cprofile_path', default=None, help='Schrijf ook een cProfile-dump (pstats) naar dit bestand.')
+@click.pass_context
+def cli(ctx, profile, cprofile_path):
     """
     dumpert is een tool voor het downloaden, transcriberen en compileren van videoclips.
     """
     setup_logging()
-    pass
+    # Elke run komt in metrics.jsonl; --profile laat alleen het overzicht ervan zien.
+    metrics.start_run(ctx.invoked_subcommand)
+    setup_profiling(ctx, profile, cprofile_path)
 
 @cli.command()
 @click.argument('sentence')
@@ -69,40 +109,82 @@ def cli():
 @click.option('--post', default=0.0, help='Seconden extra na het einde van de clip.')
 @click.option('--name', '-n', default=None, help='Geef een aangepaste bestandsnaam (zonder .mp4).')
 @click.option('--limit', '-l', type=str, default=None, help='Beperk zinnen. Formaat: "10" (eerste 10), "5;8" (5 t/m 8), etc.')
-def zeg(sentence, directory, create, pre, post, name, limit):
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1), help='Aantal clips dat tegelijk gerenderd wordt (standaard 1), en processen voor het bijwerken van de index (standaard: alle cores).')
+@click.option('--geen-cache', 'no_cache', is_flag=True, help='Render alle clips opnieuw zonder de clip-cache.')
+@click.option('--render', 'render_engine', default='auto', type=click.Choice(RENDER_ENGINES), help="'per-clip' (ffmpeg per clip), 'enkel' (één ffmpeg voor alles), 'stream' (per clip, direct samengevoegd) of 'auto' (kiest op aantal clips).")
+@click.option('--draft', is_flag=True, help='Snelle ruwe versie zonder overlays, waar mogelijk zonder her-encoderen.')
+@click.option('--min-duur', 'min_length', type=float, default=None, help='Sla woordfragmenten korter dan dit (seconden) over.')
+@click.option('--max-duur', 'max_length', type=float, default=None, help='Sla woordfragmenten langer dan dit (seconden) over.')
+@click.option('--fuzzy', is_flag=True, help='Vervang woorden die niet voorkomen door de dichtstbijzijnde spelling uit de database.')
+def zeg(sentence, directory, create, pre, post, name, limit, jobs, no_cache, render_engine, draft, min_length, max_length, fuzzy):
     """Bouwt een zin woord-voor-woord uit de videobibliotheek."""
+    from rich.live import Live
+    from worddb import open_word_database
     
-    word_db = build_word_database(directory)
     words_to_find = sentence.lower().split()
     if not words_to_find:
         console.print("[red]Fout: Geen zin opgegeven.[/red]")
         return
 
+    # Met een draaiende `serve` komt alles uit diens geheugen; anders wordt de database hier geladen.
+    remote = query('woorden', directory, words=words_to_find, min_length=min_length, max_length=max_length)
+    if remote is None:
+        word_db = open_word_database(directory, jobs=jobs)
+        known_counts = {word: word_db.count(word) for word in words_to_find if word in word_db}
+    else:
+        word_db = None
+        known_counts = remote['counts']
+
+    missing = [word for word in dict.fromkeys(words_to_find) if word not in known_counts]
+    if fuzzy and missing:
+        variants = find_variants(directory, missing, limit=1, word_db=word_db)
+        replacements = {word: variants[word][0] for word in missing if variants.get(word)}
+        for word, (variant, distance, count) in replacements.items():
+            console.print(f"- Woord '[red]{word}[/red]' niet gevonden, '[yellow]{variant}[/yellow]' gebruikt "
+                          f"(afstand {distance}, {count} keer).")
+        if replacements:
+            words_to_find = [replacements[word][0] if word in replacements else word for word in words_to_find]
+            sentence = ' '.join(words_to_find)
+            # Opnieuw tellen, nu met de vervangen woorden.
+            if remote is not None:
+                remote = query('woorden', directory, words=words_to_find, min_length=min_length, max_length=max_length)
+            if remote is None:
+                word_db = word_db or open_word_database(directory, jobs=jobs)
+                known_counts = {word: word_db.count(word) for word in words_to_find if word in word_db}
+            else:
+                known_counts = remote['counts']
+
     console.print(f"\n--- Analyse voor de zin: '[cyan]{sentence}[/cyan]' ---")
     
-    available_clips = {}
-    min_count = float('inf')
+    word_counts = {}
     limiting_word = ""
+    # Een woord dat vaker in de zin staat levert per zin meerdere voorkomens in.
+    multiplicity = Counter(words_to_find)
 
     for word in words_to_find:
-        if word in word_db:
-            count = len(word_db[word])
-            available_clips[word] = word_db[word]
-            if count < min_count:
-                min_count = count
+        if word in known_counts:
+            word_counts[word] = known_counts[word]
+            if (not limiting_word or word_counts[word] // multiplicity[word]
+                    < word_counts[limiting_word] // multiplicity[limiting_word]):
                 limiting_word = word
         else:
             console.print(f"- Woord '[red]{word}[/red]' -> NIET GEVONDEN in de database.")
             console.print("\n[bold red]Kan de zin niet bouwen omdat een of meerdere woorden missen.[/bold red]")
             return
             
+    # Elk voorkomen wordt maar één keer gebruikt, dus een woord dat vaker in de zin staat telt zwaarder.
+    if remote:
+        min_count = remote['max_sentences']
+    else:
+        from planner import max_sentences
+        min_count = max_sentences(word_db, words_to_find, min_length, max_length)
     console.print("--------------------")
     console.print(f"De zwakste schakel is '[yellow]{limiting_word}[/yellow]'.")
     console.print(f"Er kunnen maximaal [bold green]{min_count}[/bold green] unieke zinnen worden gemaakt.")
     
     with Live(console=console, screen=False, auto_refresh=False, vertical_overflow="crop") as live:
         for word in words_to_find:
-            count = len(available_clips.get(word, []))
+            count = word_counts.get(word, 0)
             preview_text = f"> Woord '[green]{word}[/green]' -> [cyan]{count}[/cyan] keer gevonden."
             live.update(preview_text, refresh=True)
             time.sleep(0.1)
@@ -123,26 +205,32 @@ def zeg(sentence, directory, create, pre, post, name, limit):
         num_sentences_to_build = loop_end - loop_start
         console.print(f"\nStarten met het bouwen van [bold green]{num_sentences_to_build}[/bold green] zin(nen) (range {loop_start + 1} tot {loop_end})...")
         
-        for word in available_clips:
-            random.shuffle(available_clips[word])
-            
-        master_clip_plan = []
-        for i in range(loop_start, loop_end):
-            for word in words_to_find:
-                if i < len(available_clips[word]):
-                    clip_to_add = available_clips[word][i]
-                    master_clip_plan.append(clip_to_add)
-        
+        sentences = None if remote is None else query('plan', directory, words=words_to_find,
+                                                       n=num_sentences_to_build, min_length=min_length,
+                                                       max_length=max_length)
+        if sentences is None:
+            from planner import plan_sentences
+            word_db = word_db or open_word_database(directory, jobs=jobs)
+            sentences = plan_sentences(word_db, words_to_find, num_sentences_to_build, min_length, max_length)
+        master_clip_plan = [clip for clips in sentences for clip in clips]
+        source_count = len({clip['video_path'] for clip in master_clip_plan})
+        console.print(f"-> Zinsplan: [bold green]{len(sentences)}[/bold green] zin(nen) uit [cyan]{source_count}[/cyan] bronvideo('s).")
+
         if name:
             output_name = f"{name}.mp4"
         else:
             output_name = f"zeg-compilatie.mp4" 
         
+        from compiler import create_supercut
         create_supercut(
             master_clip_plan, 
             output_filename=output_name, 
             pre=pre, 
-            post=post
+            post=post,
+            jobs=jobs or 1,
+            use_cache=not no_cache,
+            render_engine=render_engine,
+            draft=draft
         )
     else:
         console.print("\n-> Gebruik de [bold cyan]-k[/bold cyan] vlag om de video te genereren.")
@@ -156,8 +244,13 @@ def zeg(sentence, directory, create, pre, post, name, limit):
 @click.option('--name', '-n', default=None, help='Geef een aangepaste bestandsnaam (zonder .mp4).')
 @click.option('--limit', '-l', type=str, default=None, help='Beperk clips. Formaat: "40" (eerste 40), "10;20" (10 t/m 20), ";20" (t/m 20), "10;" (vanaf 10).')
 @click.argument('search_terms', nargs=-1)
-def zoek(directory, create, pre, post, name, limit, search_terms): 
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1), help='Aantal clips dat tegelijk gerenderd wordt (standaard 1), en processen voor het bijwerken van de index (standaard: alle cores).')
+@click.option('--geen-cache', 'no_cache', is_flag=True, help='Render alle clips opnieuw zonder de clip-cache.')
+@click.option('--render', 'render_engine', default='auto', type=click.Choice(RENDER_ENGINES), help="'per-clip' (ffmpeg per clip), 'enkel' (één ffmpeg voor alles), 'stream' (per clip, direct samengevoegd) of 'auto' (kiest op aantal clips).")
+@click.option('--draft', is_flag=True, help='Snelle ruwe versie zonder overlays, waar mogelijk zonder her-encoderen.')
+def zoek(directory, create, pre, post, name, limit, jobs, no_cache, render_engine, draft, search_terms): 
     """Vindt en compileert hele segmenten waarin een zoekterm voorkomt."""
+    from rich.live import Live
     if not search_terms:
         click.echo("Fout: Geef ten minste één zoekterm op.", err=True)
         return
@@ -166,7 +259,10 @@ def zoek(directory, create, pre, post, name, limit, search_terms):
         return
 
     click.echo(f"Zoek-commando wordt uitgevoerd in '{directory}'...")
-    results = find_phrases(directory, list(search_terms))
+    results = query('zoek', directory, terms=list(search_terms))
+    if results is None:
+        from parser import find_phrases
+        results = find_phrases(directory, list(search_terms), jobs=jobs)
     
     if not results:
         console.print("[yellow]-> Geen resultaten gevonden.[/yellow]")
@@ -196,7 +292,9 @@ def zoek(directory, create, pre, post, name, limit, search_terms):
             output_name = f"{name}.mp4"
         else:
             output_name = f"zoek-compilatie.mp4"
-        create_supercut(clips_to_compile, output_filename=output_name, pre=pre, post=post)
+        from compiler import create_supercut
+        create_supercut(clips_to_compile, output_filename=output_name, pre=pre, post=post, jobs=jobs or 1, use_cache=not no_cache,
+                        render_engine=render_engine, draft=draft)
 
 @cli.command()
 @click.option('--pre', default=0.0, help='Seconden extra voor de start van de clip.')
@@ -206,13 +304,31 @@ def zoek(directory, create, pre, post, name, limit, search_terms):
 @click.option('--name', '-n', default=None, help='Geef een aangepaste bestandsnaam (zonder .mp4).')
 @click.option('--limit', '-l', type=str, default=None, help='Beperk clips. Formaat: "40" (eerste 40), "10;20" (10 t/m 20), ";20" (t/m 20), "10;" (vanaf 10).')
 @click.argument('search_terms', nargs=-1)
-def kut(pre, post, randomize, create, name, limit, search_terms): 
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1), help='Aantal clips dat tegelijk gerenderd wordt (standaard 1), en processen voor het bijwerken van de index (standaard: alle cores).')
+@click.option('--geen-cache', 'no_cache', is_flag=True, help='Render alle clips opnieuw zonder de clip-cache.')
+@click.option('--render', 'render_engine', default='auto', type=click.Choice(RENDER_ENGINES), help="'per-clip' (ffmpeg per clip), 'enkel' (één ffmpeg voor alles), 'stream' (per clip, direct samengevoegd) of 'auto' (kiest op aantal clips).")
+@click.option('--draft', is_flag=True, help='Snelle ruwe versie zonder overlays, waar mogelijk zonder her-encoderen.')
+@click.option('--fuzzy', is_flag=True, help='Zoek ook naar andere spellingen van de woorden (reet, reeth, reed...).')
+def kut(pre, post, randomize, create, name, limit, jobs, no_cache, render_engine, draft, search_terms, fuzzy): 
     """Zoekt en compileert direct een video van exacte woorden/zinnen."""
     if not search_terms:
         console.print("[red]Fout: Geen zoektermen opgegeven.[/red]")
         return
 
-    results = find_precise_clips('videos', list(search_terms))
+    if fuzzy:
+        words = list(dict.fromkeys(word for term in search_terms for word in term.lower().split()))
+        variants = find_variants('videos', words)
+        for word in words:
+            if variants.get(word):
+                console.print(f"-> Varianten van '[cyan]{word}[/cyan]': "
+                              + ", ".join(f"{variant} ({count})" for variant, _, count in variants[word]))
+        from fuzzy import expand_terms
+        search_terms = expand_terms(search_terms, variants)
+
+    results = query('kut', 'videos', terms=list(search_terms))
+    if results is None:
+        from parser import find_precise_clips
+        results = find_precise_clips('videos', list(search_terms), jobs=jobs)
 
     if not results:
         console.print("[yellow]Geen resultaten gevonden.[/yellow]")
@@ -223,6 +339,7 @@ def kut(pre, post, randomize, create, name, limit, search_terms):
     if create:
         clips_to_compile = results
         if randomize:
+            import random
             console.print("-> Clips worden in willekeurige volgorde geplaatst...")
             random.shuffle(results)
             logging.info("Clip-volgorde is willekeurig gemaakt.")
@@ -237,16 +354,42 @@ def kut(pre, post, randomize, create, name, limit, search_terms):
             output_name = f"{name}.mp4"
         else:
             output_name = f"kut-compilatie.mp4"
-        create_supercut(clips_to_compile, output_filename=output_name, pre=pre, post=post)
+        from compiler import create_supercut
+        create_supercut(clips_to_compile, output_filename=output_name, pre=pre, post=post, jobs=jobs or 1, use_cache=not no_cache,
+                        render_engine=render_engine, draft=draft)
     else:
         console.print("\n-> Gebruik de [bold cyan]-k[/bold cyan] vlag om de video te genereren.")
 
 @cli.command()
 @click.argument('url')
 @click.option('--output-dir', default='videos', help='Map om video\'s in op te slaan.')
-def download(url, output_dir):
+@click.option('--jobs', '-j', default=3, type=click.IntRange(min=1), help='Aantal video\'s dat tegelijk gedownload wordt.')
+@click.option('--retries', default=3, type=click.IntRange(min=0), help='Aantal extra pogingen per video bij een fout.')
+@click.option('--cookies', default='firefox', help="Browser waar yt-dlp de cookies uit haalt ('' voor geen).")
+def download(url, output_dir, jobs, retries, cookies):
     """Download een video of playlist met yt-dlp."""
-    download_video(url, output_dir)
+    from downloader import download_video
+    download_video(url, output_dir, jobs=jobs, retries=retries, cookies_from_browser=cookies or None)
+
+@cli.command()
+@click.argument('url')
+@click.option('--output-dir', default='videos', help='Map om video\'s in op te slaan (en te indexeren).')
+@click.option('--jobs', '-j', default=3, type=click.IntRange(min=1), help='Aantal video\'s dat tegelijk gedownload wordt.')
+@click.option('--transcribe-jobs', '-t', default=1, type=click.IntRange(min=1), help='Aantal video\'s dat tegelijk getranscribeerd wordt.')
+@click.option('--retries', default=3, type=click.IntRange(min=0), help='Aantal extra pogingen per video bij een fout.')
+@click.option('--cookies', default='firefox', help="Browser waar yt-dlp de cookies uit haalt ('' voor geen).")
+@click.option('--prompt', default="reet, reten, reeten, rate, raten", help='Hint voor de transcribeer-engine.')
+@click.option('--mode', default='standard', type=click.Choice(['standard', 'demucs'], case_sensitive=False), help="Transcriptie modus.")
+@click.option('--engine', default='cli', type=click.Choice(['cli', 'inproces'], case_sensitive=False), help="'cli' (whisperx proces per video) of 'inproces' (modellen blijven geladen).")
+def ingest(url, output_dir, jobs, transcribe_jobs, retries, cookies, prompt, mode, engine):
+    """Download, transcribeer en indexeer een playlist in één doorlopende pijplijn."""
+    from downloader import YT_DLP_EXEC_PATH
+    if not os.path.exists(YT_DLP_EXEC_PATH):
+        console.print(f"[red]Fout: yt-dlp niet gevonden op: {YT_DLP_EXEC_PATH}[/red]")
+        return
+    from ingest import ingest as run_ingest
+    run_ingest(url, output_dir, download_jobs=jobs, transcribe_jobs=transcribe_jobs, prompt=prompt, mode=mode,
+               engine=engine, retries=retries, cookies_from_browser=cookies or None)
 
 @cli.command()
 @click.argument('path')
@@ -257,10 +400,101 @@ def download(url, output_dir):
     type=click.Choice(['standard', 'demucs'], case_sensitive=False),
     help="Transcriptie modus: 'standard' (snel, met VAD), 'demucs' (langzaamst, hoogste kwaliteit)."
 )
-def transcribe(path, prompt, mode):
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='Aantal video\'s dat tegelijk getranscribeerd wordt.')
+@click.option(
+    '--engine',
+    default='cli',
+    type=click.Choice(['cli', 'inproces'], case_sensitive=False),
+    help="'cli' (whisperx proces per video) of 'inproces' (modellen blijven de hele run geladen)."
+)
+def transcribe(path, prompt, mode, jobs, engine):
     """Transcribeert een video of map met WhisperX."""
+    from transcriber import transcribe_path
     console.print(f"--> Transcriptie gestart in [cyan]{mode}[/cyan] modus...")
-    transcribe_path(path, prompt, mode)
+    transcribe_path(path, prompt, mode, jobs, engine)
+
+@cli.command()
+@click.option('--directory', '-d', default='videos', help='De map met transcripties.')
+def align(directory):
+    """Geeft transcripties zonder tijden per woord (ondertitels, mislukte alignment) alsnog woordtijden."""
+    if not os.path.isdir(directory):
+        console.print(f"[bold red]Fout: Map '{directory}' niet gevonden.[/bold red]")
+        return
+    from transcriber import align_path
+    align_path(directory)
+
+@cli.command()
+@click.option('--directory', '-d', default='videos', help='De map met video\'s.')
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='Aantal video\'s dat tegelijk geprobed wordt.')
+@click.option('--force', is_flag=True, help='Probe alle video\'s opnieuw, ook als ze niet veranderd zijn.')
+@click.option('--keyframes', is_flag=True, help='Zoek ook alvast de keyframes op (alleen nodig voor --draft).')
+def reindex(directory, jobs, force, keyframes):
+    """Werkt de video-metadata (duur, streams, en met --keyframes de keyframes) bij voor nieuwe en gewijzigde video's."""
+    if not os.path.isdir(directory):
+        click.echo(f"Fout: De map '{directory}' is niet gevonden.", err=True)
+        return
+    from probe import reindex as reindex_videos
+    reindex_videos(directory, jobs=jobs, force=force, keyframes=keyframes)
+
+@cli.command()
+@click.option('--directory', '-d', default='videos', help='De map die bediend wordt.')
+@click.option('--interval', default=5.0, type=click.FloatRange(min=0.5), help='Seconden tussen het opzoeken van nieuwe transcripties.')
+def serve(directory, interval):
+    """Houdt de index warm achter een Unix-socket; zeg, zoek en kut gebruiken hem automatisch."""
+    from server import serve as run_server
+    run_server(directory, watch_interval=interval)
+
+@cli.group()
+def bench():
+    """Meet de snelheid van onderdelen van de tool."""
+    pass
+
+@bench.command('woorden')
+@click.option('--directory', '-d', default='videos', help='De map die doorzocht moet worden.')
+@click.option('--zin', default='hallo allemaal en welkom', help='Zin waarvan de woorden worden opgezocht.')
+@click.option('--herhaal', default=3, help='Aantal metingen per formaat (de beste telt).')
+def bench_woorden(directory, zin, herhaal):
+    """Vergelijkt laadtijd en geheugen van de JSON- en binaire woorden-database."""
+    from bench import bench_word_database
+    bench_word_database(directory, zin, herhaal)
+
+@bench.command('scan')
+@click.option('--directory', '-d', default='videos', help='De map die doorzocht moet worden.')
+@click.option('--herhaal', default=3, help='Aantal metingen per methode (de beste telt).')
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1), help='Aantal processen voor de parallelle meting (standaard: alle cores).')
+@click.argument('search_terms', nargs=-1)
+def bench_scan(directory, herhaal, jobs, search_terms):
+    """Vergelijkt de woord-scan zonder index: oud, nieuw, met sidecars en over meerdere processen."""
+    from bench import bench_scan as run_bench
+    run_bench(directory, list(search_terms) or ['hallo allemaal', 'dumpert reten', 'ja'], herhaal, jobs)
+
+@bench.command('suite')
+@click.option('--groottes', default='25,100,400', help='Aantal transcripties per synthetische bibliotheek, komma-gescheiden.')
+@click.option('--woorden', default=2850, type=click.IntRange(min=10), help='Gemiddeld aantal woorden per transcriptie.')
+@click.option('--clips', default=6, type=click.IntRange(min=0), help='Aantal clips voor de render-meting (0 = niet renderen).')
+@click.option('--herhaal', default=3, help='Aantal metingen per zoekstap (de beste telt).')
+@click.option('--uitvoer', default='bench_resultaten.jsonl', help='Bestand waar de resultaten als JSON-regel aan worden toegevoegd.')
+@click.option('--seed', default=0, help='Seed voor de synthetische bibliotheek.')
+@click.option('--bewaar', is_flag=True, help='Laat de gegenereerde bibliotheken staan.')
+def bench_suite(groottes, woorden, clips, herhaal, uitvoer, seed, bewaar):
+    """Meet index, woorden-database, zoeken, zeg-plan en renderen op synthetische bibliotheken."""
+    from bench import bench_suite as run_suite
+    try:
+        sizes = [int(size) for size in groottes.split(',') if size.strip()]
+    except ValueError:
+        console.print(f"[bold red]Fout: Ongeldige groottes '{groottes}'. Gebruik bijvoorbeeld '25,100,400'.[/bold red]")
+        return
+    run_suite(sizes, woorden, clips, herhaal, uitvoer, seed, bewaar)
+
+@bench.command('opstart')
+@click.option('--herhaal', default=10, help='Aantal keer opstarten per commando (de beste telt).')
+@click.option('--budget', default=None, type=click.IntRange(min=1), help='Maximale opstarttijd in ms (standaard: 250).')
+@click.pass_context
+def bench_opstart(ctx, herhaal, budget):
+    """Meet de opstarttijd van de CLI en faalt boven het budget of als er zware modules meekomen."""
+    from bench import bench_startup, STARTUP_BUDGET_MS
+    if not bench_startup(repeat=herhaal, budget_ms=budget or STARTUP_BUDGET_MS):
+        ctx.exit(1)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
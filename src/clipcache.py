@@ -0,0 +1,78 @@
+# src/clipcache.py
+import os
+import json
+import hashlib
+import logging
+import subprocess
+
+CLIP_CACHE_DIR = 'clip_cache'
+CLIP_CACHE_MAX_BYTES = 5 * 1024 ** 3
+
+def clip_key(video_path, **params):
+    """
+    Sleutel voor een gerenderd segment: de identiteit van de bronvideo (pad, grootte, mtime)
+    plus alle parameters die het resultaat bepalen (tijden, overlay-tekst, encoder-instellingen).
+    """
+    stat = os.stat(video_path)
+    identity = {'video': os.path.abspath(video_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+    payload = json.dumps({**identity, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _paths(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.ts"), os.path.join(cache_dir, f"{key}.json")
+
+def lookup(key, cache_dir=CLIP_CACHE_DIR):
+    """Geeft (pad, duur) van een gecachte clip, of None. Een hit telt als recent gebruik."""
+    ts_path, meta_path = _paths(key, cache_dir)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        os.utime(ts_path)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return ts_path, meta['duration']
+
+def probe_duration(path):
+    """Werkelijke duur van een gerenderde clip volgens ffprobe."""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, check=True).stdout
+    return float(output.strip())
+
+def store(key, rendered_path, cache_dir=CLIP_CACHE_DIR):
+    """Verplaatst een vers gerenderde clip de cache in en geeft (pad, duur) terug."""
+    os.makedirs(cache_dir, exist_ok=True)
+    ts_path, meta_path = _paths(key, cache_dir)
+    duration = probe_duration(rendered_path)
+    os.replace(rendered_path, ts_path)
+    # De metadata komt als laatste, zodat een half geschreven entry nooit als hit telt.
+    tmp_meta = f"{meta_path}.tmp"
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump({'duration': duration}, f)
+    os.replace(tmp_meta, meta_path)
+    return ts_path, duration
+
+def evict(max_bytes=CLIP_CACHE_MAX_BYTES, cache_dir=CLIP_CACHE_DIR):
+    """Gooit de minst recent gebruikte clips weg tot de cache onder max_bytes zit."""
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.ts'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name[:-3]))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in _paths(key, cache_dir):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    if removed:
+        logging.info(f"Clip-cache: {removed} clip(s) verwijderd, nog {total / 1024 ** 2:.0f} MB in gebruik.")
+    return removed
@@ -2,80 +2,503 @@
 import subprocess
 import os
 import shutil
+import time
+import tempfile
+import threading
+import bisect
 import logging
-from rich.console import Console
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from console import console
 from rich.progress import Progress
+import clipcache
+import probe
+import metrics
 
 FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+SCALE_PAD_FILTER = "scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080:-1:-1"
+ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac']
+TEXT_STYLE = "fontsize=32:fontcolor=white:box=1:boxcolor=black@0.5"
+AUDIO_FILTER = "aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo"
+# Tot zoveel clips is één ffmpeg met een concat-filter sneller dan een proces per clip.
+SINGLE_PASS_MAX_CLIPS = 12
+DRAFT_ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac']
+# Keyframes dichter dan dit bij het begin of einde van een clip tellen als 'precies erop'.
+KEYFRAME_TOLERANCE = 0.02
+SEEK_EPSILON = 0.001
+# Bij streamen mogen er per worker zoveel clips onderweg zijn (aan het renderen of wachtend op
+# hun beurt); meer tijdelijke clips dan jobs * dit staan er nooit tegelijk op schijf.
+STREAM_WINDOW_PER_JOB = 2
 
-console = Console(force_terminal=True)
-def create_supercut(clips, output_filename="dumpert-kut.mp4", pre=0.0, post=0.0):
+def _escape_drawtext(text):
+    """Escapet tekst voor gebruik binnen text='...' van het drawtext filter."""
+    return text.replace('\\', '\\\\').replace("'", "’").replace(':', '\\:').replace('%', '\\%')
+
+def _video_title(video_path):
+    return os.path.basename(os.path.dirname(video_path)).replace("_", " ")
+
+def _title_filter(video_path):
+    return (f"drawtext=fontfile='{FONT_PATH}':text='{_escape_drawtext(_video_title(video_path))}'"
+            f":x=(w-text_w)/2:y=h-text_h-20:{TEXT_STYLE}")
+
+def _counter_filter(text, window=None):
+    # Met een venster (begin, eind) staat de teller alleen in dat stuk van de supercut;
+    # het eind hoort er niet bij, zodat op de grens maar één teller te zien is.
+    enable = f":enable='gte(t,{window[0]:.3f})*lt(t,{window[1]:.3f})'" if window else ""
+    return (f"drawtext=fontfile='{FONT_PATH}':text='{_escape_drawtext(text)}'"
+            f":x=w-text_w-20:y=20:{TEXT_STYLE}{enable}")
+
+def _clip_window(clip, pre, post):
+    """Begin en duur van een clip inclusief de extra marge, begrensd op de echte lengte van de video."""
+    clip_start = max(0, float(clip['start_timestamp']) - pre)
+    clip_end = float(clip['end_timestamp']) + post
+    duration = probe.video_info(clip['video_path'])['duration']
+    if duration > 0:
+        clip_end = min(clip_end, duration)
+        clip_start = min(clip_start, clip_end)
+    return clip_start, clip_end - clip_start
+
+def _base_filters(info):
+    """Schalen naar 1920x1080 en yuv420p, zonder de stappen die voor deze bron niets doen."""
+    video = info.get('video') or {}
+    steps = []
+    if (video.get('width'), video.get('height')) != (1920, 1080) or video.get('sar') not in ('1:1', '0:1'):
+        steps.append(SCALE_PAD_FILTER)
+    if video.get('pix_fmt') != 'yuv420p':
+        steps.append('format=yuv420p')
+    return steps
+
+def _audio_filters(info):
+    """Gelijktrekken naar 48 kHz stereo voor het concat-filter, alleen waar nodig."""
+    audio = info.get('audio') or {}
+    if audio.get('sample_rate') == 48000 and audio.get('channel_layout') == 'stereo':
+        return []
+    return [AUDIO_FILTER]
+
+def _silence_input(duration):
+    """Stille audio voor bronnen zonder audiospoor, zodat concat overal een audiostream heeft."""
+    return ['-f', 'lavfi', '-t', f"{duration:.3f}", '-i', 'anullsrc=r=48000:cl=stereo']
+
+@metrics.timed('clip renderen')
+def _render_clip(clip, ts_filepath, pre, post, threads, counter_text=None):
     """
-    Maakt een supercut-video van een lijst met clips.
+    Rendert één clip met overlays naar een .ts bestand. Zonder counter_text krijgt de clip
+    alleen de titel (zo gaat hij de cache in); de '(i/N)' teller komt er dan bij het
+    samenvoegen op (_counter_script), of bij streamen met _overlay_counter.
     """
-    if not clips:
-        console.print("[yellow]Geen clips om te compileren.[/yellow]")
-        return
+    info = probe.video_info(clip['video_path'])
+    clip_start, clip_duration = _clip_window(clip, pre, post)
+    filters = _base_filters(info) + [_title_filter(clip['video_path'])]
+    if counter_text is not None:
+        filters.append(_counter_filter(counter_text))
 
-    project_root = os.getcwd()
-    temp_dir = os.path.join(project_root, "temp_clips")
-    os.makedirs(temp_dir, exist_ok=True)
+    inputs = ['-ss', str(clip_start), '-t', str(clip_duration), '-i', clip['video_path']]
+    if info.get('audio') is None:
+        inputs += _silence_input(clip_duration) + ['-map', '0:v:0', '-map', '1:a:0']
+    ffmpeg_command = [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', *inputs,
+        '-vf', ",".join(filters), *ENCODER_ARGS, '-threads', str(threads), ts_filepath
+    ]
+    subprocess.run(ffmpeg_command, check=True)
+
+def _cache_key(clip, pre, post):
+    # De teller hoort er bewust niet bij: een andere volgorde of --limit hergebruikt dezelfde clips.
+    return clipcache.clip_key(
+        clip['video_path'],
+        start=float(clip['start_timestamp']), end=float(clip['end_timestamp']), pre=pre, post=post,
+        overlay=_video_title(clip['video_path']), filter=_base_filters(probe.video_info(clip['video_path'])),
+        encoder=ENCODER_ARGS, font=FONT_PATH,
+    )
 
-    ts_files = []
+@metrics.timed('teller toevoegen')
+def _overlay_counter(ts_path, out_path, counter_text, threads):
+    """
+    Zet de '(i/N)' teller op een gecachte clip voor de stream-engine, die elke clip als copy
+    aan de supercut toevoegt. Alleen de video wordt opnieuw ge-encodeerd, de audio gaat er
+    ongewijzigd doorheen.
+    """
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-y', '-hide_banner', '-loglevel', 'error', '-i', ts_path,
+        '-vf', _counter_filter(counter_text), '-c:v', 'libx264', '-preset', 'ultrafast',
+        '-threads', str(threads), '-c:a', 'copy', out_path
+    ], check=True)
+
+def _prepare_clip(clip, index, total_clips, key, temp_dir, pre, post, threads, use_cache, key_locks,
+                  counter=False):
+    """
+    Draait in een worker: zorgt dat clip `index` klaarstaat. Zonder cache wordt hij met titel
+    en teller in temp_dir gerenderd. Met cache komt de clip zonder teller uit de cache (of wordt
+    hij gerenderd en opgeslagen) en wordt het gecachte bestand zelf teruggegeven; alleen met
+    counter krijgt een tijdelijke kopie de teller. Geeft (pad, duur of None, cache-hit) terug.
+    """
+    ts_filepath = os.path.join(temp_dir, f"clip_{index + 1:04d}.ts")
+    counter_text = f"{clip['found_phrase']} ({index + 1}/{total_clips})"
+    if not use_cache:
+        logging.info(f"Clip {index + 1}/{total_clips}: '{clip['found_phrase']}' in {os.path.basename(clip['video_path'])}")
+        _render_clip(clip, ts_filepath, pre, post, threads, counter_text)
+        return ts_filepath, None, False
+    # Dezelfde clip twee keer in het plan wordt maar één keer gerenderd; de tweede wacht en is dan een hit.
+    with key_locks.setdefault(key, threading.Lock()):
+        cached = clipcache.lookup(key)
+        hit = cached is not None
+        if not hit:
+            logging.info(f"Clip {index + 1}/{total_clips}: '{clip['found_phrase']}' in {os.path.basename(clip['video_path'])}")
+            render_path = os.path.join(temp_dir, f"clip_{index + 1:04d}.render.ts")
+            _render_clip(clip, render_path, pre, post, threads)
+            cached = clipcache.store(key, render_path)
+    cached_path, duration = cached
+    if not counter:
+        return cached_path, duration, hit
+    _overlay_counter(cached_path, ts_filepath, counter_text, threads)
+    return ts_filepath, duration, hit
+
+def _render_clips(clips, temp_dir, pre, post, jobs, use_cache):
+    """
+    FASE 1: zet alle clips klaar, `jobs` tegelijk: zonder cache met titel en teller in temp_dir,
+    met cache als gecachte clip zonder teller. Geeft per clip (pad, duur of None) terug in de
+    volgorde van het clip-plan.
+    """
     total_clips = len(clips)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    keys = [_cache_key(clip, pre, post) for clip in clips] if use_cache else [None] * total_clips
+    key_locks = {}
+    rendered = [None] * total_clips
+    hits = 0
 
-    console.print(f"\n[FASE 1/2] Clips genereren ({total_clips} in totaal)...")
+    console.print(f"\n[FASE 1/2] Clips genereren ({total_clips} in totaal, {jobs} tegelijk)...")
     with Progress(console=console) as progress:
         task = progress.add_task("[cyan]Verwerken...", total=total_clips)
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_prepare_clip, clip, index, total_clips, keys[index], temp_dir,
+                                   pre, post, threads, use_cache, key_locks): index
+                       for index, clip in enumerate(clips)}
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    ts_path, duration, hit = future.result()
+                    rendered[index] = (ts_path, duration)
+                    hits += hit
+                    clip = clips[index]
+                    progress.update(task, description=f"[cyan]Clip {index + 1}/{total_clips}: '{clip['found_phrase']} in {_video_title(clip['video_path'])}'[/cyan]")
+                    progress.advance(task)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    if use_cache:
+        logging.info(f"Clip-cache: {hits} hit(s), {total_clips - hits} nieuw gerenderd.")
+    return rendered
 
-        for i, clip in enumerate(clips, 1):
-            video_path = clip['video_path']
-            video_title = os.path.basename(os.path.dirname(video_path)).replace("_", " ")
-            found_phrase = clip['found_phrase']
-        
-            progress.update(task, description=f"[cyan]Clip {i}/{total_clips}: '{found_phrase} in {video_title}'[/cyan]")
-            logging.info(f"Clip {i}/{total_clips}: '{found_phrase}' in {os.path.basename(video_path)}")
-
-            ts_filepath = os.path.join(temp_dir, f"clip_{i:04d}.ts")
-            ts_files.append(ts_filepath)
-            
-            start_seconds = float(clip['start_timestamp'])
-            end_seconds = float(clip['end_timestamp'])
-            clip_start = max(0, start_seconds - pre)
-            clip_end = end_seconds + post
-            clip_duration = clip_end - clip_start
-
-            video_title = os.path.basename(os.path.dirname(video_path)).replace("_", " ")
-            text_counter = f"{clip['found_phrase']} ({i}/{total_clips})"
-
-            ffmpeg_command = [
-                'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
-                '-ss', str(clip_start), '-t', str(clip_duration), '-i', video_path,
-                '-vf', (
-                    f"scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080:-1:-1,format=yuv420p,"
-                    f"drawtext=fontfile='{FONT_PATH}':text='{video_title}':x=(w-text_w)/2:y=h-text_h-20:fontsize=32:fontcolor=white:box=1:boxcolor=black@0.5,"
-                    f"drawtext=fontfile='{FONT_PATH}':text='{text_counter}':x=w-text_w-20:y=20:fontsize=32:fontcolor=white:box=1:boxcolor=black@0.5"
-                ),
-                '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', ts_filepath
-            ]
-            subprocess.run(ffmpeg_command, check=True)
-            progress.advance(task)
-
-    print("\n[FASE 2/2] Finale supercut renderen...")
+def _counter_script(clips, rendered, temp_dir):
+    """Filterscript dat per clip de '(i/N)' teller toont, op basis van de werkelijke clipduur."""
+    total_clips = len(clips)
+    filters = []
+    offset = 0.0
+    for i, (clip, (_, duration)) in enumerate(zip(clips, rendered), 1):
+        filters.append(_counter_filter(f"{clip['found_phrase']} ({i}/{total_clips})", (offset, offset + duration)))
+        offset += duration
+    script_path = os.path.join(temp_dir, "counter_filter.txt")
+    with open(script_path, 'w', encoding='utf-8') as f:
+        f.write(",\n".join(filters))
+    return script_path
+
+def _render_per_clip(clips, final_output_path, temp_dir, pre, post, jobs, use_cache):
+    """Rendert elke clip met een eigen ffmpeg-proces en plakt ze daarna aan elkaar."""
+    rendered = _render_clips(clips, temp_dir, pre, post, jobs, use_cache)
+
+    print("\n[FASE 2/2] Finale supercut samenvoegen...")
     concat_list_path = os.path.join(temp_dir, "concat_list.txt")
     with open(concat_list_path, 'w') as f:
-        for ts_file in sorted(ts_files):
-            f.write(f"file '{os.path.basename(ts_file)}'\n")
-    
+        for ts_file, _ in rendered:
+            f.write(f"file '{os.path.abspath(ts_file)}'\n")
+
+    concat_command = [
+        'ffmpeg', '-nostdin', '-y', '-hide_banner', '-loglevel', 'warning', '-f', 'concat',
+        '-safe', '0', '-i', concat_list_path
+    ]
+    if use_cache:
+        # De gecachte clips gaan ongewijzigd de concat in; de tellers komen er in één pass over
+        # de hele supercut op, met enable-vensters op de werkelijke clipduur.
+        concat_command += ['-filter_script:v', _counter_script(clips, rendered, temp_dir),
+                           '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'copy', final_output_path]
+    else:
+        # Zonder cache heeft elke clip zijn teller al, dus samenvoegen is alleen nog kopiëren.
+        concat_command += ['-c', 'copy', final_output_path]
+    with metrics.span('concat', clips=len(clips), counter=use_cache):
+        subprocess.run(concat_command, check=True)
+
+def _append_clip(muxer_stdin, ts_path, offset):
+    """Schuift één clip op `offset` seconden en schrijft hem als MPEG-TS (copy) naar de muxer van de supercut."""
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', ts_path, '-c', 'copy',
+        '-output_ts_offset', f"{offset:.6f}", '-f', 'mpegts', 'pipe:1'
+    ], stdout=muxer_stdin, check=True)
+
+def _render_stream(clips, final_output_path, temp_dir, pre, post, jobs, use_cache):
+    """
+    Zet de clips met `jobs` workers klaar (net als per-clip, maar altijd met teller) en voegt elke
+    clip aan de supercut toe zodra hij en alle clips vóór hem klaar zijn. Eén ffmpeg muxt de
+    doorlopende MPEG-TS stroom naar de mp4; een tijdelijke clip wordt weggegooid zodra hij
+    erin zit. Er worden hoogstens jobs * STREAM_WINDOW_PER_JOB clips vooruit klaargezet, dus
+    de tijdelijke ruimte hangt af van het aantal workers en niet van het aantal clips.
+    """
+    total_clips = len(clips)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    keys = [_cache_key(clip, pre, post) for clip in clips] if use_cache else [None] * total_clips
+    key_locks = {}
+    window = jobs * STREAM_WINDOW_PER_JOB
+
+    console.print(f"\n[FASE 1/1] Clips renderen en direct samenvoegen ({total_clips} in totaal, {jobs} tegelijk)...")
+    muxer_command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'warning', '-f', 'mpegts', '-i', 'pipe:0',
+                     '-c', 'copy', final_output_path]
+    muxer = subprocess.Popen(muxer_command, stdin=subprocess.PIPE)
+    pending = {}
+    offset = 0.0
+    hits = 0
+    try:
+        with Progress(console=console) as progress, ThreadPoolExecutor(max_workers=jobs) as pool:
+            task = progress.add_task("[cyan]Verwerken...", total=total_clips)
+            submitted = 0
+            try:
+                for index, clip in enumerate(clips):
+                    while submitted < min(total_clips, index + window):
+                        pending[submitted] = pool.submit(_prepare_clip, clips[submitted], submitted, total_clips,
+                                                         keys[submitted], temp_dir, pre, post, threads,
+                                                         use_cache, key_locks, counter=True)
+                        submitted += 1
+                    ts_path, duration, hit = pending.pop(index).result()
+                    hits += hit
+                    if duration is None:
+                        duration = clipcache.probe_duration(ts_path)
+                    with metrics.span('clip toevoegen'):
+                        _append_clip(muxer.stdin, ts_path, offset)
+                    offset += duration
+                    os.remove(ts_path)
+                    progress.update(task, description=f"[cyan]Clip {index + 1}/{total_clips}: '{clip['found_phrase']} in {_video_title(clip['video_path'])}'[/cyan]")
+                    progress.advance(task)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        muxer.stdin.close()
+        if muxer.wait() != 0:
+            raise subprocess.CalledProcessError(muxer.returncode, muxer_command)
+    except BaseException:
+        muxer.kill()
+        muxer.wait()
+        raise
+    if use_cache:
+        logging.info(f"Clip-cache: {hits} hit(s), {total_clips - hits} nieuw gerenderd.")
+
+@metrics.timed('single-pass renderen')
+def _render_single_pass(clips, final_output_path, temp_dir, pre, post):
+    """
+    Rendert de hele supercut met één ffmpeg-aanroep: elke clip is een eigen getrimde input
+    en een concat-filter plakt ze aan elkaar. Scheelt per clip een proces, het openen
+    van de bron en een aparte concat-stap.
+    """
+    total_clips = len(clips)
+    inputs, filters, labels = [], [], []
+    total_duration = 0.0
+    for index, clip in enumerate(clips):
+        info = probe.video_info(clip['video_path'])
+        clip_start, clip_duration = _clip_window(clip, pre, post)
+        total_duration += clip_duration
+        inputs += ['-ss', str(clip_start), '-t', str(clip_duration), '-i', clip['video_path']]
+        counter = _counter_filter(f"{clip['found_phrase']} ({index + 1}/{total_clips})")
+        # Elk segment begint op t=0 en krijgt dezelfde SAR en audio-indeling, anders weigert concat.
+        video_steps = _base_filters(info) + ['setsar=1', 'setpts=PTS-STARTPTS',
+                                             _title_filter(clip['video_path']), counter]
+        filters.append(f"[{index}:v:0]{','.join(video_steps)}[v{index}]")
+        if info.get('audio') is None:
+            filters.append(f"anullsrc=r=48000:cl=stereo,atrim=duration={clip_duration:.3f}[a{index}]")
+        else:
+            audio_steps = _audio_filters(info) + ['asetpts=PTS-STARTPTS']
+            filters.append(f"[{index}:a:0]{','.join(audio_steps)}[a{index}]")
+        labels.append(f"[v{index}][a{index}]")
+    filters.append(f"{''.join(labels)}concat=n={total_clips}:v=1:a=1[v][a]")
+
+    script_path = os.path.join(temp_dir, "single_pass_filter.txt")
+    with open(script_path, 'w', encoding='utf-8') as f:
+        f.write(";\n".join(filters))
+
+    ffmpeg_command = [
+        'ffmpeg', '-nostdin', '-y', '-hide_banner', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1',
+        *inputs, '-filter_complex_script', script_path, '-map', '[v]', '-map', '[a]',
+        *ENCODER_ARGS, final_output_path
+    ]
+    console.print(f"\n[FASE 1/1] Supercut in één pass renderen ({total_clips} clips)...")
+    with Progress(console=console) as progress:
+        task = progress.add_task("[cyan]Renderen...", total=total_duration)
+        process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, text=True)
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            # out_time_ms is ondanks de naam ook in microseconden.
+            if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+                progress.update(task, completed=min(total_duration, int(value) / 1e6))
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, ffmpeg_command)
+        progress.update(task, completed=total_duration)
+
+def _cut_part(video_path, start, duration, part_path, threads, copy_frames=None):
+    """
+    Knipt één deel. Met copy_frames wordt de video gekopieerd; het aantal frames begrenst de
+    copy, omdat -t bij stream-copy op dts afkapt en door B-frames te veel meeneemt. De audio
+    wordt altijd ge-encodeerd: dat kost bijna niets en houdt de knip sample-precies.
+    """
+    if copy_frames is not None:
+        codec_args = ['-c:v', 'copy', '-frames:v', str(copy_frames), '-c:a', 'aac']
+    else:
+        codec_args = [*DRAFT_ENCODER_ARGS, '-threads', str(threads)]
+    ffmpeg_command = [
+        'ffmpeg', '-nostdin', '-y', '-hide_banner', '-loglevel', 'error',
+        '-ss', f"{start:.6f}", '-t', f"{duration:.6f}", '-i', video_path, *codec_args, part_path
+    ]
+    subprocess.run(ffmpeg_command, check=True)
+
+@metrics.timed('draft-clip knippen')
+def _render_draft_clip(clip, index, temp_dir, pre, post, threads):
+    """
+    Knipt een clip zonder overlays. Het stuk tussen de eerste en laatste keyframe wordt
+    gekopieerd; alleen de kop tot de eerste keyframe en de staart vanaf de laatste worden
+    opnieuw ge-encodeerd. Zonder twee keyframes in de clip, of als de bron geen h264/yuv420p
+    is, wordt de hele clip ge-encodeerd. Een clip van lengte 0 levert geen delen op.
+    Geeft de delen terug in afspeelvolgorde.
+    """
+    info = probe.video_info(clip['video_path'])
+    clip_start, clip_duration = _clip_window(clip, pre, post)
+    if clip_duration <= 0:
+        logging.info(f"Draft clip {index + 1}: lengte 0, overgeslagen.")
+        return []
+    clip_end = clip_start + clip_duration
+    video = info.get('video') or {}
+    # Alleen h264/yuv420p past tussen de libx264-kop en -staart; av01 of vp9 van yt-dlp niet.
+    # Voor andere bronnen is de keyframe-scan dus niet eens nodig.
+    copyable = (video.get('codec'), video.get('pix_fmt')) == ('h264', 'yuv420p')
+    lo = hi = 0
+    if copyable:
+        frames = probe.keyframe_info(clip['video_path'])
+        keyframes = frames['keyframes']
+        lo = bisect.bisect_left(keyframes, clip_start - KEYFRAME_TOLERANCE)
+        hi = bisect.bisect_right(keyframes, clip_end + KEYFRAME_TOLERANCE)
+
+    pieces = []
+    if hi - lo < 2:
+        pieces.append((clip_start, clip_end, None))
+    else:
+        first, last = keyframes[lo], keyframes[hi - 1]
+        if first - clip_start > KEYFRAME_TOLERANCE:
+            pieces.append((clip_start, first, None))
+        # Net voorbij de keyframe zoeken: -ss springt naar de keyframe op of vóór dat punt,
+        # dus een afrondingsfout naar beneden zou een hele GOP te vroeg beginnen.
+        pieces.append((first + SEEK_EPSILON, last, sum(frames['gop_frames'][lo:hi - 1])))
+        if clip_end - last > KEYFRAME_TOLERANCE:
+            pieces.append((last, clip_end, None))
+
+    parts = []
+    for n, (start, end, copy_frames) in enumerate(pieces):
+        part_path = os.path.join(temp_dir, f"clip_{index + 1:04d}_{n}.ts")
+        _cut_part(clip['video_path'], max(0.0, start), end - start, part_path, threads, copy_frames)
+        parts.append(part_path)
+    copied = sum(end - start for start, end, copy_frames in pieces if copy_frames is not None)
+    logging.info(f"Draft clip {index + 1}: {copied:.2f}s van {clip_duration:.2f}s gekopieerd, "
+                 f"{len(pieces)} deel/delen.")
+    return parts
+
+def _render_draft(clips, final_output_path, temp_dir, pre, post, jobs):
+    """Draft-modus: ruwe knippen zonder overlays, zoveel mogelijk met stream-copy."""
+    total_clips = len(clips)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    parts = [None] * total_clips
+
+    console.print(f"\n[FASE 1/2] Draft-clips knippen ({total_clips} in totaal, {jobs} tegelijk)...")
+    with Progress(console=console) as progress:
+        task = progress.add_task("[cyan]Knippen...", total=total_clips)
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_render_draft_clip, clip, index, temp_dir, pre, post, threads): index
+                       for index, clip in enumerate(clips)}
+            try:
+                for future in as_completed(futures):
+                    parts[futures[future]] = future.result()
+                    progress.advance(task)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    print("\n[FASE 2/2] Draft samenvoegen...")
+    concat_list_path = os.path.join(temp_dir, "concat_list.txt")
+    with open(concat_list_path, 'w') as f:
+        for clip_parts in parts:
+            for part_path in clip_parts:
+                f.write(f"file '{os.path.abspath(part_path)}'\n")
+    with metrics.span('concat', clips=total_clips, counter=False):
+        subprocess.run([
+            'ffmpeg', '-nostdin', '-y', '-hide_banner', '-loglevel', 'warning', '-f', 'concat',
+            '-safe', '0', '-i', concat_list_path, '-c', 'copy', final_output_path
+        ], check=True)
+
+def _choose_engine(render_engine, clips, pre, post, use_cache):
+    """Kiest bij 'auto' de render-engine op basis van het aantal clips."""
+    if render_engine != 'auto':
+        return render_engine
+    if use_cache and all(clipcache.lookup(_cache_key(clip, pre, post)) for clip in clips):
+        # Alles staat al in de cache: dan is alleen nog samenvoegen nodig.
+        return 'per-clip'
+    if len(clips) > SINGLE_PASS_MAX_CLIPS:
+        # Veel clips: direct samenvoegen, zodat niet alle tussenclips tegelijk op schijf staan.
+        return 'stream'
+    return 'enkel'
+
+def create_supercut(clips, output_filename="dumpert-kut.mp4", pre=0.0, post=0.0, jobs=1, use_cache=True,
+                    render_engine='auto', draft=False):
+    """
+    Maakt een supercut-video van een lijst met clips.
+    Met jobs > 1 worden de clips door meerdere ffmpeg-processen tegelijk gerenderd;
+    de volgorde in de supercut blijft die van de lijst. Met use_cache worden gerenderde
+    clips bewaard in clip_cache/ en bij een volgende compilatie hergebruikt.
+    render_engine is 'per-clip', 'enkel' (één ffmpeg met een concat-filter), 'stream' (per clip,
+    maar elke clip gaat meteen in volgorde de supercut in, met begrensde tijdelijke ruimte) of
+    'auto', dat tot SINGLE_PASS_MAX_CLIPS clips voor 'enkel' kiest en daarboven voor 'stream'.
+    Met draft=True komt er een ruwe versie zonder overlays die waar mogelijk stream-copy
+    gebruikt; render_engine en use_cache gelden dan niet.
+    """
+    if not clips:
+        console.print("[yellow]Geen clips om te compileren.[/yellow]")
+        return
+
+    project_root = os.getcwd()
+    # Elke run een eigen map onder temp_clips/, zodat compilaties naast elkaar kunnen draaien.
+    temp_root = os.path.join(project_root, "temp_clips")
+    os.makedirs(temp_root, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix="run-", dir=temp_root)
     output_dir = os.path.join(project_root, "kuts")
     os.makedirs(output_dir, exist_ok=True)
     final_output_path = os.path.join(output_dir, output_filename)
-    concat_command = [
-        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'warning', '-f', 'concat', 
-        '-safe', '0', '-i', concat_list_path, '-c', 'copy', final_output_path
-    ]
-    subprocess.run(concat_command, check=True)
 
-    shutil.rmtree(temp_dir)
+    engine = 'draft' if draft else _choose_engine(render_engine, clips, pre, post, use_cache)
+    logging.info(f"Render-engine '{engine}' gekozen voor {len(clips)} clips "
+                 f"(gevraagd: {render_engine}, drempel: {SINGLE_PASS_MAX_CLIPS}, jobs: {jobs}).")
+    start = time.perf_counter()
+    try:
+        with metrics.span('supercut', engine=engine, clips=len(clips), jobs=jobs):
+            if engine == 'draft':
+                _render_draft(clips, final_output_path, temp_dir, pre, post, jobs)
+            elif engine == 'enkel':
+                _render_single_pass(clips, final_output_path, temp_dir, pre, post)
+            elif engine == 'stream':
+                _render_stream(clips, final_output_path, temp_dir, pre, post, jobs, use_cache)
+            else:
+                _render_per_clip(clips, final_output_path, temp_dir, pre, post, jobs, use_cache)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        try:
+            os.rmdir(temp_root)
+        except OSError:
+            # Er draait nog een andere compilatie.
+            pass
+    elapsed = time.perf_counter() - start
+    logging.info(f"Render-engine '{engine}': {len(clips)} clips in {elapsed:.2f}s "
+                 f"({elapsed / len(clips):.2f}s per clip).")
+
+    if use_cache and not draft:
+        clipcache.evict()
     print(f"-> Supercut opgeslagen als: {output_filename}")
-    logging.info(f"-> Supercut opgeslagen als: {output_filename}")
\ No newline at end of file
+    logging.info(f"-> Supercut opgeslagen als: {output_filename}")
@@ -0,0 +1,6 @@
+# src/console.py
+from rich.console import Console
+
+# Eén console voor alle modules: rich wordt maar één keer opgezet, en meldingen en
+# voortgangsbalken uit verschillende modules delen dezelfde uitvoer.
+console = Console(force_terminal=True)
@@ -1,40 +1,176 @@
 # src/downloader.py
-import subprocess
 import os
+import json
+import random
+import asyncio
+import logging
+from console import console
+from rich.progress import Progress
 
 YT_DLP_EXEC_PATH = os.path.join(os.getcwd(), 'vendor/yt-dlp/yt-dlp_linux')
+# Zelfde formaat als yt-dlp's --download-archive: per regel "<extractor> <id>". Items waarvan
+# de playlist geen id geeft (bijv. RSS-feeds) staan erin als "url <url>".
+ARCHIVE_FILE = 'download_archive.txt'
+DOWNLOAD_JOBS = 3
+DOWNLOAD_RETRIES = 3
+RETRY_BACKOFF = 2.0
 
-def download_video(url, output_dir):
-    """
-    Download een video of playlist met de opgegeven yt-dlp executable.
+def read_archive(archive_path):
+    """De ids die al binnen zijn. Een ontbrekend archief is gewoon leeg."""
+    try:
+        with open(archive_path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
 
-    Args:
-        url (str): De URL van de video of playlist.
-        output_dir (str): De map waar de video's moeten worden opgeslagen.
+def archive_id(entry):
+    """Het archief-id van een playlist-item, zoals yt-dlp het zelf wegschrijft."""
+    if entry.get('ie_key') and entry.get('id'):
+        return f"{entry['ie_key'].lower()} {entry['id']}"
+    return f"url {entry['url']}"
+
+def cookie_args(browser):
+    """yt-dlp argumenten om de cookies uit een browser te halen; leeg voor geen."""
+    return ['--cookies-from-browser', browser] if browser else []
+
+def _append_archive(archive_path, entry):
+    with open(archive_path, 'a', encoding='utf-8') as f:
+        f.write(archive_id(entry) + '\n')
+
+async def _run(command):
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace')
+
+async def expand_playlist(url, yt_dlp=YT_DLP_EXEC_PATH, extra_args=()):
     """
-    if not os.path.exists(YT_DLP_EXEC_PATH):
-        print(f"Fout: yt-dlp niet gevonden op: {YT_DLP_EXEC_PATH}")
-        return False
+    Haalt alleen de lijst met items op (--flat-playlist), zonder per video formaten te proben.
+    Een losse video geeft een lijst met één item.
+    """
+    returncode, stdout, stderr = await _run([yt_dlp, '--flat-playlist', '-J', *extra_args, url])
+    if returncode != 0:
+        raise RuntimeError(stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {returncode}")
+    info = json.loads(stdout)
+    if info.get('_type') != 'playlist':
+        return [{'id': info.get('id'), 'ie_key': info.get('extractor_key'), 'title': info.get('title'),
+                 'url': info.get('webpage_url') or url}]
+    entries = []
+    for entry in info.get('entries') or []:
+        if entry:
+            entries.append({'id': entry.get('id'), 'ie_key': entry.get('ie_key'), 'title': entry.get('title'),
+                            'url': entry.get('webpage_url') or entry.get('url')})
+    return entries
 
-    os.makedirs(output_dir, exist_ok=True)
+async def _download_entry(entry, command, archive_path, semaphore, retries, backoff, on_done=None):
+    """
+    Eén item met yt-dlp, met exponentiële backoff tussen pogingen. Geeft None of de laatste fout.
+    `on_done(entry, pad)` wordt nog binnen de semaphore afgewacht, zodat een volle wachtrij
+    verderop ook het starten van nieuwe downloads afremt.
+    """
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * 2 ** (attempt - 1) * (1 + random.random())
+            logging.info(f"Opnieuw proberen over {delay:.1f}s ({attempt}/{retries}): {entry['url']}")
+            await asyncio.sleep(delay)
+        async with semaphore:
+            returncode, stdout, stderr = await _run([*command, entry['url']])
+            if returncode == 0:
+                _append_archive(archive_path, entry)
+                if on_done is not None:
+                    lines = stdout.strip().splitlines()
+                    await on_done(entry, lines[-1] if lines else None)
+                return None
+        error = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {returncode}"
+        logging.warning(f"Download mislukt ({attempt + 1}/{retries + 1}) voor {entry['url']}: {error}")
+    return error
 
-    command = [
-        YT_DLP_EXEC_PATH,
+def _download_command(output_dir, yt_dlp, cookie_args):
+    return [
+        yt_dlp,
         '-f', 'bv[ext=mp4]+ba[ext=m4a]/b[ext=mp4]',
-        '--cookies-from-browser', 'firefox',
+        *cookie_args,
         '--restrict-filenames',
+        '--no-playlist',
+        '--quiet', '--no-warnings', '--no-progress',
+        # Het uiteindelijke pad op stdout, zodat een volgende stap weet waar de video staat.
+        '--print', 'after_move:filepath',
         '-o', os.path.join(output_dir, '%(title)s/%(title)s.%(ext)s'),
-        url
     ]
 
+async def download_entries(entries, output_dir, jobs=DOWNLOAD_JOBS, retries=DOWNLOAD_RETRIES,
+                           backoff=RETRY_BACKOFF, yt_dlp=YT_DLP_EXEC_PATH, cookie_args=(), on_done=None):
+    """
+    Downloadt uitgeklapte playlist-items met hoogstens `jobs` yt-dlp processen tegelijk.
+    Elk geslaagd item komt direct in het archief. Geeft {index in entries: fout} voor de mislukte items.
+    """
+    archive_path = os.path.join(output_dir, ARCHIVE_FILE)
+    command = _download_command(output_dir, yt_dlp, cookie_args)
+    semaphore = asyncio.Semaphore(jobs)
+    errors = await asyncio.gather(*(_download_entry(entry, command, archive_path, semaphore, retries, backoff, on_done)
+                                    for entry in entries))
+    return {i: error for i, error in enumerate(errors) if error is not None}
+
+async def download_playlist(url, output_dir, jobs=DOWNLOAD_JOBS, retries=DOWNLOAD_RETRIES,
+                            backoff=RETRY_BACKOFF, yt_dlp=YT_DLP_EXEC_PATH, cookies_from_browser='firefox'):
+    """
+    Klapt de playlist uit en downloadt de items met hoogstens `jobs` yt-dlp processen tegelijk.
+    Items die al in het download-archief staan worden overgeslagen zonder netwerkverkeer,
+    dus een afgebroken run gaat verder waar hij was.
+    Geeft (gedownload, overgeslagen, mislukt).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    archive_path = os.path.join(output_dir, ARCHIVE_FILE)
+    cookies = cookie_args(cookies_from_browser)
+
+    console.print(f"-> Playlist uitklappen: [cyan]{url}[/cyan]")
+    entries = await expand_playlist(url, yt_dlp, cookies)
+    archive = read_archive(archive_path)
+    pending = [entry for entry in entries if archive_id(entry) not in archive]
+    skipped = len(entries) - len(pending)
+    console.print(f"--> {len(entries)} item(s) gevonden, [green]{skipped}[/green] al gedownload, "
+                  f"[cyan]{len(pending)}[/cyan] te gaan ({jobs} tegelijk).")
+    logging.info(f"Download {url}: {len(entries)} items, {skipped} in archief, {len(pending)} te gaan.")
+
+    if not pending:
+        return 0, skipped, 0
+    with Progress(console=console) as progress:
+        task = progress.add_task("[cyan]Downloaden...", total=len(pending))
+        async def advance(entry, path):
+            progress.advance(task)
+        errors = await download_entries(pending, output_dir, jobs, retries, backoff, yt_dlp, cookies, on_done=advance)
+        progress.update(task, completed=len(pending))
+    for i, error in errors.items():
+        console.print(f"[red]✗ {pending[i].get('title') or pending[i]['url']}: {error}[/red]")
+        logging.error(f"Download definitief mislukt voor {pending[i]['url']}: {error}")
+    return len(pending) - len(errors), skipped, len(errors)
+
+def download_video(url, output_dir, jobs=DOWNLOAD_JOBS, retries=DOWNLOAD_RETRIES,
+                   yt_dlp=YT_DLP_EXEC_PATH, cookies_from_browser='firefox'):
+    """
+    Download een video of playlist met de opgegeven yt-dlp executable.
+
+    Args:
+        url (str): De URL van de video of playlist.
+        output_dir (str): De map waar de video's moeten worden opgeslagen.
+        jobs (int): Aantal items dat tegelijk gedownload wordt.
+        retries (int): Aantal extra pogingen per item.
+    """
+    if not os.path.exists(yt_dlp):
+        print(f"Fout: yt-dlp niet gevonden op: {yt_dlp}")
+        return False
+
     print("--- DOWNLOAD GESTART ---")
     try:
-        subprocess.run(command, check=True)
-        print("--- DOWNLOAD KLAAR ---")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Fout tijdens het downloaden: {e}")
+        downloaded, skipped, failed = asyncio.run(
+            download_playlist(url, output_dir, jobs=jobs, retries=retries, yt_dlp=yt_dlp,
+                              cookies_from_browser=cookies_from_browser))
+    except (RuntimeError, json.JSONDecodeError) as e:
+        print(f"Fout tijdens het uitklappen van de playlist: {e}")
         return False
-    except FileNotFoundError:
-        print(f"Fout: Kan commando niet uitvoeren. Is yt-dlp correct geplaatst en uitvoerbaar?")
-        return False
\ No newline at end of file
+    except OSError as e:
+        print(f"Fout: Kan commando niet uitvoeren. Is yt-dlp correct geplaatst en uitvoerbaar? ({e})")
+        return False
+    print(f"--- DOWNLOAD KLAAR: {downloaded} nieuw, {skipped} overgeslagen, {failed} mislukt ---")
+    return failed == 0
@@ -0,0 +1,207 @@
+# src/fuzzy.py
+import os
+import re
+import time
+import logging
+import unicodedata
+import numpy as np
+
+FUZZY_SUFFIX = '.fuzzy.npz'
+# Langere "woorden" zijn vrijwel altijd transcriptie-rommel; die doen niet mee.
+MAX_WORD_LENGTH = 32
+# Zoveel varianten per woord neemt --fuzzy hoogstens mee.
+FUZZY_VARIANTS = 5
+
+# Per regel (patroon, vervanging), in deze volgorde toegepast. Grof, maar genoeg om de
+# spellingen die WhisperX door elkaar haalt (reet/reeten, wijf/weif, gozer/gozur) samen te laten vallen.
+_PHONETIC_RULES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r'sch', 'sg'), (r'ch', 'g'), (r'ph', 'f'), (r'th', 't'),
+    (r'ij|y|ei', 'ei'), (r'ou|au', 'au'),
+    (r'c(?=[eiy])', 's'), (r'c|q', 'k'), (r'x', 'ks'),
+    (r'z', 's'), (r'v', 'f'), (r'dt\b|d\b', 't'),
+    (r'(?<=.)h', ''), (r'([a-z])\1+', r'\1'),
+)]
+
+def phonetic_key(word):
+    """Nederlandse klanksleutel: accenten weg, klanken die hetzelfde klinken gelijkgetrokken, dubbele letters enkel."""
+    key = unicodedata.normalize('NFKD', word.lower()).encode('ascii', 'ignore').decode('ascii')
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+def _trigrams(word):
+    padded = f"  {word}  "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def default_distance(word):
+    """Korte woorden mogen minder afwijken, anders lijkt alles op alles."""
+    return 1 if len(word) <= 4 else 2
+
+def _postings(groups, dtype):
+    """{sleutel: [ids]} als gesorteerde sleutels plus offsets in één platte id-array."""
+    keys = sorted(groups)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(groups[key]) for key in keys])
+    ids = np.fromiter((i for key in keys for i in groups[key]), dtype=np.int32, count=int(offsets[-1]))
+    return np.array(keys, dtype=dtype), offsets, ids
+
+def _lookup(keys, offsets, ids, key):
+    i = int(np.searchsorted(keys, key))
+    if i < len(keys) and keys[i] == key:
+        return ids[offsets[i]:offsets[i + 1]]
+    return ids[:0]
+
+class FuzzyIndex:
+    """
+    Trigram-index plus klanksleutels over de vocabulaire van een WordDatabase, als platte
+    NumPy-arrays zodat hij in één keer van schijf geladen kan worden. Een opzoeking telt
+    hoeveel trigrams elk woord met de zoekterm deelt, houdt alleen de woorden over die
+    volgens het q-gram lemma binnen de afstand kunnen liggen, en rekent voor die allemaal
+    tegelijk de edit-afstand uit (bit-parallel, Myers). Klankgenoten tellen altijd mee.
+    """
+
+    def __init__(self, word_db, arrays):
+        self.word_db = word_db
+        self.counts = word_db.counts()
+        self.lengths = arrays['lengths']
+        self.codes = arrays['codes']
+        self.grams = (arrays['gram_keys'], arrays['gram_offsets'], arrays['gram_ids'])
+        self.phonetic = (arrays['phonetic_keys'], arrays['phonetic_offsets'], arrays['phonetic_ids'])
+        self.alphabet = {char: code for code, char in enumerate(arrays['alphabet'].tolist(), 1)}
+
+    @staticmethod
+    def build(words):
+        """De arrays voor een FuzzyIndex over `words` (in de volgorde van de WordDatabase)."""
+        grams, phonetic, alphabet = {}, {}, set()
+        for i, word in enumerate(words):
+            if len(word) > MAX_WORD_LENGTH:
+                continue
+            alphabet.update(word)
+            for gram in _trigrams(word):
+                grams.setdefault(gram, []).append(i)
+            phonetic.setdefault(phonetic_key(word).encode('ascii'), []).append(i)
+        alphabet = sorted(alphabet)
+        code_of = {char: code for code, char in enumerate(alphabet, 1)}
+        codes = np.zeros((len(words), MAX_WORD_LENGTH), dtype=np.uint16)
+        lengths = np.zeros(len(words), dtype=np.int32)
+        for i, word in enumerate(words):
+            if len(word) <= MAX_WORD_LENGTH:
+                codes[i, :len(word)] = [code_of[char] for char in word]
+                lengths[i] = len(word)
+        arrays = {'lengths': lengths, 'codes': codes, 'alphabet': np.array(alphabet, dtype='U1')}
+        arrays['gram_keys'], arrays['gram_offsets'], arrays['gram_ids'] = _postings(grams, 'U3')
+        arrays['phonetic_keys'], arrays['phonetic_offsets'], arrays['phonetic_ids'] = _postings(phonetic, 'S')
+        return arrays
+
+    def _distances(self, word, candidates):
+        """Levenshtein-afstand van `word` tot elk kandidaat-id, voor alle kandidaten tegelijk."""
+        m = len(word)
+        peq = np.zeros(len(self.alphabet) + 1, dtype=np.uint64)
+        for i, char in enumerate(word):
+            code = self.alphabet.get(char)
+            if code:
+                peq[code] |= np.uint64(1 << i)
+        mask, high, one = np.uint64((1 << m) - 1), np.uint64(1 << (m - 1)), np.uint64(1)
+        lengths = self.lengths[candidates]
+        width = min(int(lengths.max()), MAX_WORD_LENGTH)
+        columns = np.ascontiguousarray(self.codes[candidates, :width].T)
+        pv = np.full(len(candidates), mask, dtype=np.uint64)
+        mv = np.zeros(len(candidates), dtype=np.uint64)
+        score = np.full(len(candidates), m, dtype=np.int64)
+        for j in range(width):
+            eq = peq[columns[j]]
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            active = lengths > j
+            score += ((ph & high) != 0) & active
+            score -= ((mh & high) != 0) & active
+            ph = (ph << one) | one
+            pv = ((mh << one) | ~(xv | ph)) & mask
+            mv = ph & xv
+        return score
+
+    def similar(self, word, max_distance=None, limit=10):
+        """
+        Varianten van `word` uit de vocabulaire (het woord zelf niet), als (variant, afstand, aantal),
+        gesorteerd op afstand en dan op hoe vaak ze voorkomen. Klankgenoten krijgen afstand 0.
+        """
+        if not word or len(word) > MAX_WORD_LENGTH:
+            return []
+        if max_distance is None:
+            max_distance = default_distance(word)
+        found = {}
+        grams = [_lookup(*self.grams, gram) for gram in _trigrams(word)]
+        grams = [ids for ids in grams if len(ids)]
+        if grams:
+            shared = np.bincount(np.concatenate(grams), minlength=len(self.lengths))
+            # Elke bewerking raakt hoogstens drie trigrams.
+            needed = max(1, len(word) + 2 - 3 * max_distance)
+            candidates = np.flatnonzero((shared >= needed) & (self.lengths > 0)
+                                        & (np.abs(self.lengths - len(word)) <= max_distance))
+            if len(candidates):
+                distances = self._distances(word, candidates)
+                close = distances <= max_distance
+                found = dict(zip(candidates[close].tolist(), distances[close].tolist()))
+        key = phonetic_key(word).encode('ascii')
+        if key:
+            for i in _lookup(*self.phonetic, key).tolist():
+                found[i] = 0
+        ranked = sorted((distance, -int(self.counts[i]), i) for i, distance in found.items())
+        variants = []
+        for distance, negative_count, i in ranked:
+            variant = self.word_db.word(i)
+            if variant != word:
+                variants.append((variant, distance, -negative_count))
+            if len(variants) == limit:
+                break
+        return variants
+
+def _save(path, generation, arrays):
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, generation=np.int64(generation), **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Kon {path} niet schrijven: {e}")
+
+def _load(path, generation):
+    try:
+        with np.load(path) as data:
+            if int(data['generation']) != generation:
+                return None
+            return {name: data[name] for name in data.files if name != 'generation'}
+    except (OSError, ValueError, KeyError):
+        return None
+
+def open_fuzzy_index(word_db, path=None):
+    """
+    De FuzzyIndex bij een geopende WordDatabase. Staat naast de database op schijf
+    (word_database.<sleutel>.fuzzy.npz) en wordt opnieuw gebouwd zodra de generatie
+    van de database niet meer klopt.
+    """
+    path = path or os.path.splitext(word_db.file)[0] + FUZZY_SUFFIX
+    arrays = _load(path, word_db.generation)
+    if arrays is None:
+        start = time.perf_counter()
+        arrays = FuzzyIndex.build(word_db.words())
+        _save(path, word_db.generation, arrays)
+        logging.info(f"Fuzzy-index gebouwd over {word_db.n_words} woorden in {time.perf_counter() - start:.2f}s.")
+    return FuzzyIndex(word_db, arrays)
+
+def expand_terms(terms, variants):
+    """
+    De zoektermen plus, per woord in een term, de term met dat woord vervangen door elk van
+    zijn varianten uit `variants` ({woord: [(variant, afstand, aantal), ...]}).
+    """
+    expanded = list(terms)
+    for term in terms:
+        term_words = term.lower().split()
+        for i, word in enumerate(term_words):
+            for variant, _, _ in variants.get(word, []):
+                candidate = ' '.join(term_words[:i] + [variant] + term_words[i + 1:])
+                if candidate not in expanded:
+                    expanded.append(candidate)
+    return expanded
@@ -0,0 +1,268 @@
+# src/indexer.py
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rich.progress import Progress, track
+from console import console
+from transcript import read_transcript, find_transcript_files, video_path_for
+import metrics
+
+INDEX_FILE = 'word_index.db'
+SCHEMA_VERSION = '2'
+# Zoveel transcripties gaan hoogstens in één keer naar een worker-proces.
+INDEX_CHUNK_SIZE = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    json_path TEXT UNIQUE NOT NULL,
+    video_path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    has_video INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    video_id INTEGER NOT NULL,
+    seg_id INTEGER NOT NULL,
+    start REAL,
+    end REAL,
+    text TEXT NOT NULL,
+    text_lower TEXT NOT NULL,
+    PRIMARY KEY (video_id, seg_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    word TEXT NOT NULL,
+    video_id INTEGER NOT NULL,
+    seg_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    start REAL,
+    end REAL
+);
+CREATE INDEX IF NOT EXISTS postings_word ON postings (word, video_id, pos);
+CREATE UNIQUE INDEX IF NOT EXISTS postings_pos ON postings (video_id, pos);
+"""
+
+def root_file(name, root_dir):
+    """
+    Bestandsnaam voor een afgeleid bestand (index, woordendatabase) van de map root_dir.
+    Elke map krijgt een eigen bestand, en videos, ./videos en /pad/naar/videos delen dat ene bestand.
+    """
+    key = hashlib.sha1(os.path.realpath(root_dir).encode('utf-8')).hexdigest()[:12]
+    base, ext = os.path.splitext(name)
+    return f"{base}.{key}{ext}"
+
+def index_path(root_dir):
+    """Pad van de woorden-index voor de transcripties onder root_dir."""
+    return root_file(INDEX_FILE, root_dir)
+
+@metrics.timed('transcripties zoeken')
+def find_transcripts(root_dir):
+    """
+    Geeft per aflevering onder root_dir de transcriptie terug (WhisperX JSON, of anders een
+    .tsv/.vtt/.srt ondertitel), in os.walk volgorde.
+    """
+    return find_transcript_files(root_dir)
+
+def _transcript_rows(video_id, json_path):
+    """Leest een transcriptie en geeft de segment- en postings-rijen, of None."""
+    transcript = read_transcript(json_path, cache=False)
+    if transcript is None: return None
+
+    segment_rows = [(video_id, seg_id, start, end, text, text.lower())
+                    for seg_id, (start, end, text) in enumerate(transcript.segments)]
+    # Ook woorden zonder tijden krijgen een positie, zodat zinnen niet over gaten heen matchen.
+    posting_rows = [(word, video_id, seg_id, pos, start, end)
+                    for pos, (word, seg_id, start, end) in enumerate(zip(
+                        transcript.words, transcript.seg_ids, transcript.starts, transcript.ends))]
+    return segment_rows, posting_rows
+
+def _insert_rows(conn, rows):
+    if rows is None: return
+    segment_rows, posting_rows = rows
+    conn.executemany("INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?)", segment_rows)
+    conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?)", posting_rows)
+
+def _parse_chunk(work):
+    """Draait in een worker-proces: leest een reeks transcripties in en geeft hun rijen."""
+    rows = [_transcript_rows(video_id, json_path) for video_id, json_path in work]
+    # Een worker-proces ruimt niet netjes op; zijn metingen moeten nu weg.
+    metrics.flush()
+    return rows
+
+def _index_files(conn, work, jobs=None):
+    """
+    Indexeert [(video_id, json_path)]. Met meerdere cores wordt het inlezen in blokken van
+    INDEX_CHUNK_SIZE over een procespool verdeeld; de inserts blijven in dit proces, op de
+    ene sqlite-connectie.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(work) <= INDEX_CHUNK_SIZE:
+        for video_id, json_path in track(work, description="[green]Indexeren...", disable=not work):
+            logging.info(f"Indexeren: {os.path.basename(json_path)}")
+            _insert_rows(conn, _transcript_rows(video_id, json_path))
+        return
+
+    chunk_size = max(1, min(INDEX_CHUNK_SIZE, len(work) // (jobs * 4)))
+    with Progress(*Progress.get_default_columns(), console=console) as progress:
+        task = progress.add_task("[green]Indexeren...", total=len(work))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_parse_chunk, work[i:i + chunk_size])
+                       for i in range(0, len(work), chunk_size)]
+            for future in as_completed(futures):
+                rows = future.result()
+                for file_rows in rows:
+                    _insert_rows(conn, file_rows)
+                progress.advance(task, len(rows))
+    logging.info(f"{len(work)} transcripties ingelezen met {jobs} processen.")
+
+def _file_hash(path):
+    """SHA-1 van de inhoud van een bestand."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _ensure_schema(conn):
+    """Maakt de tabellen aan en gooit een index met een verouderd schema weg."""
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if row is None or row[0] != SCHEMA_VERSION:
+        logging.info("Index ontbreekt of heeft een oud schema, wordt opnieuw aangemaakt.")
+        conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS segments; "
+                           "DROP TABLE IF EXISTS videos; DROP TABLE IF EXISTS meta;")
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute("INSERT INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+            # Begint bij de aanmaaktijd, zodat een nieuwe index nooit de generatie van een oude hergebruikt.
+            conn.execute("INSERT INTO meta VALUES ('generation', ?)", (str(int(time.time())),))
+
+def _remove_file(conn, video_id):
+    conn.execute("DELETE FROM postings WHERE video_id = ?", (video_id,))
+    conn.execute("DELETE FROM segments WHERE video_id = ?", (video_id,))
+
+def index_generation(conn):
+    """Teller die omhoog gaat bij elke wijziging van de index."""
+    return int(conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+@metrics.timed('index bijwerken')
+def update_index(conn, json_files, jobs=None):
+    """
+    Werkt de index bij aan de hand van het manifest (pad, mtime, grootte, hash) per transcriptie.
+    Alleen toegevoegde, gewijzigde en verwijderde bestanden worden opnieuw geindexeerd;
+    een .mp4 die naast een al geindexeerde transcriptie verschijnt (of verdwijnt) wordt ook opgemerkt.
+    Paden worden als realpath opgeslagen, zodat de schrijfwijze van de map niet uitmaakt.
+    Het inlezen gebeurt met `jobs` processen (standaard: alle cores).
+    """
+    json_files = [os.path.realpath(path) for path in json_files]
+    manifest = {row[1]: row for row in conn.execute(
+        "SELECT id, json_path, mtime, size, hash, has_video FROM videos")}
+    next_id = max((row[0] for row in manifest.values()), default=0) + 1
+
+    added, changed, video_changes = [], [], []
+    for json_path in json_files:
+        stat = os.stat(json_path)
+        video_path = video_path_for(json_path)
+        has_video = int(os.path.exists(video_path))
+        entry = manifest.get(json_path)
+        if entry is None:
+            added.append((json_path, video_path, stat, has_video))
+            continue
+        video_id, _, mtime, size, file_hash, had_video = entry
+        if (mtime, size) != (stat.st_mtime, stat.st_size):
+            new_hash = _file_hash(json_path)
+            if new_hash != file_hash:
+                changed.append((video_id, json_path, stat, new_hash, has_video))
+                continue
+            conn.execute("UPDATE videos SET mtime = ?, size = ? WHERE id = ?",
+                         (stat.st_mtime, stat.st_size, video_id))
+        if has_video != had_video:
+            video_changes.append((has_video, video_id))
+    on_disk = set(json_files)
+    removed = [row[0] for path, row in manifest.items() if path not in on_disk]
+
+    if not (added or changed or removed or video_changes):
+        conn.commit()
+        logging.info("Actuele woorden-index gevonden.")
+        return False
+
+    console.print(f"-> [yellow]Index bijwerken: {len(added)} nieuw, {len(changed)} gewijzigd, "
+                  f"{len(removed)} verwijderd, {len(video_changes)} video('s) veranderd...[/yellow]")
+    with conn:
+        for video_id in removed:
+            _remove_file(conn, video_id)
+            conn.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+        conn.executemany("UPDATE videos SET has_video = ? WHERE id = ?", video_changes)
+        work = [(video_id, json_path) for video_id, json_path, *_ in changed]
+        for video_id, json_path, stat, new_hash, has_video in changed:
+            _remove_file(conn, video_id)
+            conn.execute("UPDATE videos SET mtime = ?, size = ?, hash = ?, has_video = ? WHERE id = ?",
+                         (stat.st_mtime, stat.st_size, new_hash, has_video, video_id))
+        for json_path, video_path, stat, has_video in added:
+            conn.execute("INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (next_id, json_path, video_path, stat.st_mtime, stat.st_size,
+                          _file_hash(json_path), has_video))
+            work.append((next_id, json_path))
+            next_id += 1
+        _index_files(conn, work, jobs)
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+    count = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    console.print(f"--> [bold green]✓ Index bijgewerkt ({count} transcripties).[/bold green]")
+    logging.info(f"Woorden-index bijgewerkt: {len(added)} nieuw, {len(changed)} gewijzigd, "
+                 f"{len(removed)} verwijderd, {len(video_changes)} video('s) veranderd.")
+    return True
+
+@metrics.timed('index laden')
+def open_index(root_dir, jobs=None):
+    """
+    Opent de woorden-index van root_dir (zie index_path) en werkt deze incrementeel bij
+    voor de transcripties eronder, met `jobs` processen. Geeft een sqlite3 connectie terug.
+    """
+    conn = sqlite3.connect(index_path(root_dir))
+    _ensure_schema(conn)
+    update_index(conn, find_transcripts(root_dir), jobs)
+    return conn
+
+def existing_videos(conn):
+    """Geeft {video_id: video_path} terug voor de transcripties waarvan de .mp4 bestaat."""
+    return dict(conn.execute("SELECT id, video_path FROM videos WHERE has_video = 1"))
+
+def query_segments(conn, term):
+    """Segmenten waarvan de tekst de term bevat: (video_id, seg_id, start, end, text)."""
+    return conn.execute(
+        "SELECT video_id, seg_id, start, end, text FROM segments "
+        "WHERE instr(text_lower, ?) > 0 ORDER BY video_id, seg_id",
+        (term.lower(),)
+    ).fetchall()
+
+def query_phrase(conn, phrase_words, same_segment=False):
+    """
+    Zoekt een reeks genormaliseerde woorden via de positionele postings.
+    Geeft (video_id, seg_id, pos, start, end) terug, met start van het eerste
+    en end van het laatste woord, gesorteerd op video en positie.
+    """
+    last = len(phrase_words) - 1
+    joins = []
+    params = []
+    for k, word in enumerate(phrase_words[1:], 1):
+        clause = f"JOIN postings p{k} ON p{k}.video_id = p0.video_id AND p{k}.pos = p0.pos + {k} AND p{k}.word = ?"
+        if same_segment:
+            clause += f" AND p{k}.seg_id = p0.seg_id"
+        joins.append(clause)
+        params.append(word)
+    params.append(phrase_words[0])
+    sql = (f"SELECT p0.video_id, p0.seg_id, p0.pos, p0.start, p{last}.end FROM postings p0 "
+           f"{' '.join(joins)} WHERE p0.word = ? ORDER BY p0.video_id, p0.pos")
+    return conn.execute(sql, params).fetchall()
+
+def query_all_words(conn):
+    """Alle woorden met tijden: (word, video_id, start, end), in transcriptie-volgorde."""
+    return conn.execute(
+        "SELECT word, video_id, start, end FROM postings "
+        "WHERE word != '' AND start IS NOT NULL AND end IS NOT NULL ORDER BY video_id, pos"
+    )
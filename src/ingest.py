@@ -0,0 +1,232 @@
+# src/ingest.py
+import os
+import json
+import queue
+import asyncio
+import logging
+import threading
+from console import console
+from downloader import (ARCHIVE_FILE, DOWNLOAD_JOBS, DOWNLOAD_RETRIES, RETRY_BACKOFF, YT_DLP_EXEC_PATH,
+                        archive_id, cookie_args, download_entries, expand_playlist, read_archive)
+from indexer import open_index, update_index, find_transcripts
+from transcriber import transcribe_file, load_engine
+
+INGEST_STATE_FILE = 'ingest_state.json'
+# De laatst afgeronde stap per aflevering.
+DOWNLOADED, TRANSCRIBED, INDEXED = 'gedownload', 'getranscribeerd', 'geindexeerd'
+# Zoveel afleveringen mogen er tussen twee stappen klaarliggen.
+QUEUE_SIZE = 2
+
+class IngestState:
+    """
+    Voortgang per aflevering (sleutel: het archief-id), bewaard in een JSON-bestand dat
+    na elke afgeronde stap atomair herschreven wordt. Elke stap draait in zijn eigen
+    thread, dus alle toegang gaat via één lock.
+    """
+
+    def __init__(self, path=INGEST_STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.episodes = json.load(f)
+        except FileNotFoundError:
+            self.episodes = {}
+
+    def get(self, key):
+        with self.lock:
+            return dict(self.episodes.get(key, {}))
+
+    def update(self, key, **fields):
+        with self.lock:
+            self.episodes.setdefault(key, {}).update(fields)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.episodes, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+def _transcript_path(video_path):
+    return os.path.splitext(video_path)[0] + '.json'
+
+def _resume_stage(episode):
+    """
+    De stap waar een aflevering verder moet. Kijkt ook naar de bestanden zelf: een run die
+    stopte net na het schrijven van de transcriptie hoeft niet opnieuw te transcriberen.
+    """
+    video_path = episode.get('video_path')
+    stage = episode.get('stage')
+    if stage == INDEXED:
+        return INDEXED
+    if video_path and os.path.exists(_transcript_path(video_path)):
+        return TRANSCRIBED
+    if video_path and os.path.exists(video_path):
+        return DOWNLOADED
+    return None
+
+def ingest(url, output_dir, download_jobs=DOWNLOAD_JOBS, transcribe_jobs=1, prompt=None, mode='standard',
+           engine='cli', retries=DOWNLOAD_RETRIES, yt_dlp=YT_DLP_EXEC_PATH, cookies_from_browser='firefox',
+           queue_size=QUEUE_SIZE):
+    """
+    Download, transcribeer en indexeer een playlist als drie overlappende stappen: elke
+    gedownloade aflevering gaat direct de transcriptie-wachtrij in en elke transcriptie direct
+    de index-wachtrij. De wachtrijen zijn begrensd, dus downloads lopen hoogstens `queue_size`
+    afleveringen voor op de transcriptie. Wat af is staat in `ingest_state.json`; een
+    onderbroken run gaat per aflevering verder bij de stap waar hij bleef.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cookies = cookie_args(cookies_from_browser)
+
+    console.print(f"-> Playlist uitklappen: [cyan]{url}[/cyan]")
+    try:
+        entries = asyncio.run(expand_playlist(url, yt_dlp, cookies))
+    except (RuntimeError, json.JSONDecodeError) as e:
+        console.print(f"[red]Fout tijdens het uitklappen van de playlist: {e}[/red]")
+        logging.error(f"Ingest {url}: uitklappen mislukt: {e}")
+        return
+    except OSError as e:
+        console.print(f"[red]Fout: Kan commando niet uitvoeren. Is yt-dlp correct geplaatst en uitvoerbaar? ({e})[/red]")
+        logging.error(f"Ingest {url}: yt-dlp niet uit te voeren: {e}")
+        return
+    state = IngestState()
+    archive = read_archive(os.path.join(output_dir, ARCHIVE_FILE))
+
+    to_download, to_transcribe, to_index, done, elsewhere = [], [], [], 0, 0
+    for entry in entries:
+        key = archive_id(entry)
+        episode = state.get(key)
+        stage = _resume_stage(episode)
+        if stage == INDEXED:
+            done += 1
+        elif stage == TRANSCRIBED:
+            to_index.append(key)
+        elif stage == DOWNLOADED:
+            to_transcribe.append((key, episode['video_path']))
+        elif key in archive:
+            # Met `download` binnengehaald: het pad is onbekend, `transcribe` pakt hem op.
+            elsewhere += 1
+        else:
+            to_download.append(entry)
+    console.print(f"--> {len(entries)} aflevering(en): [green]{done}[/green] klaar, [cyan]{len(to_download)}[/cyan] downloaden, "
+                  f"[cyan]{len(to_transcribe)}[/cyan] transcriberen, [cyan]{len(to_index)}[/cyan] indexeren.")
+    if elsewhere:
+        console.print(f"-> [yellow]{elsewhere}[/yellow] aflevering(en) al eerder met `download` binnengehaald; "
+                      f"gebruik `transcribe` voor die video's.")
+    logging.info(f"Ingest {url}: {len(entries)} items, {done} klaar, {len(to_download)} downloaden, "
+                 f"{len(to_transcribe)} transcriberen, {len(to_index)} indexeren, {elsewhere} buiten ingest.")
+    if not (to_download or to_transcribe or to_index):
+        return
+
+    if engine == 'inproces':
+        engine = load_engine(prompt)
+        transcribe_jobs = 1
+    else:
+        engine = None
+
+    transcribe_queue = queue.Queue(maxsize=queue_size)
+    index_queue = queue.Queue(maxsize=queue_size)
+    stop = object()
+    counts = {'fouten': 0}
+    counts_lock = threading.Lock()
+
+    def count_error():
+        # Wordt vanuit de download-, transcriptie- en index-threads aangeroepen.
+        with counts_lock:
+            counts['fouten'] += 1
+
+    def transcribe_worker():
+        while True:
+            item = transcribe_queue.get()
+            if item is stop:
+                return
+            key, video_path = item
+            name = os.path.basename(video_path)
+            try:
+                transcribe_file(video_path, prompt, mode, transcribe_jobs, engine)
+            except Exception as e:
+                count_error()
+                state.update(key, error=str(e))
+                console.print(f"[bold red]✗ transcriberen {name}: {e}[/bold red]")
+                logging.error(f"Ingest: transcriberen mislukt voor {name}: {e}")
+                continue
+            state.update(key, stage=TRANSCRIBED, error=None)
+            console.print(f"[green]✓ getranscribeerd:[/green] {name}")
+            index_queue.put(key)
+
+    def index_worker():
+        # De sqlite-connectie hoort bij deze thread; alles wat klaarstaat gaat in één update.
+        # Een mislukte update telt als fout, maar de wachtrij wordt altijd verder leeggetrokken,
+        # anders blijven de transcriptie-workers hangen op een volle index_queue.
+        conn = None
+        finished = False
+        while not finished:
+            keys = [index_queue.get()]
+            while True:
+                try:
+                    keys.append(index_queue.get_nowait())
+                except queue.Empty:
+                    break
+            finished = stop in keys
+            keys = [key for key in keys if key is not stop]
+            if not keys:
+                continue
+            try:
+                if conn is None:
+                    conn = open_index(output_dir)
+                else:
+                    update_index(conn, find_transcripts(output_dir))
+            except Exception as e:
+                count_error()
+                console.print(f"[bold red]✗ indexeren van {len(keys)} aflevering(en): {e}[/bold red]")
+                logging.error(f"Ingest: indexeren mislukt: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                continue
+            for key in keys:
+                state.update(key, stage=INDEXED)
+            console.print(f"[green]✓ geindexeerd:[/green] {len(keys)} aflevering(en)")
+        if conn is not None:
+            conn.close()
+
+    async def handoff(entry, video_path):
+        key = archive_id(entry)
+        if not video_path:
+            logging.warning(f"Ingest: yt-dlp gaf geen bestandsnaam voor {entry['url']}")
+            return
+        state.update(key, stage=DOWNLOADED, video_path=video_path, title=entry.get('title'), url=entry['url'])
+        console.print(f"[green]✓ gedownload:[/green] {os.path.basename(video_path)}")
+        # Blokkeert alleen deze download (die zijn plek in de semaphore vasthoudt) als de transcriptie achterloopt.
+        await asyncio.get_running_loop().run_in_executor(None, transcribe_queue.put, (key, video_path))
+
+    workers = [threading.Thread(target=transcribe_worker, daemon=True) for _ in range(transcribe_jobs)]
+    indexer = threading.Thread(target=index_worker, daemon=True)
+    for thread in [*workers, indexer]:
+        thread.start()
+    try:
+        for key in to_index:
+            index_queue.put(key)
+        for item in to_transcribe:
+            transcribe_queue.put(item)
+        if to_download:
+            errors = asyncio.run(download_entries(to_download, output_dir, download_jobs, retries, RETRY_BACKOFF,
+                                                  yt_dlp, cookies, on_done=handoff))
+            for i, error in errors.items():
+                count_error()
+                console.print(f"[bold red]✗ downloaden {to_download[i].get('title') or to_download[i]['url']}: {error}[/bold red]")
+                logging.error(f"Ingest: downloaden mislukt voor {to_download[i]['url']}: {error}")
+        for _ in workers:
+            transcribe_queue.put(stop)
+        for thread in workers:
+            thread.join()
+        index_queue.put(stop)
+        indexer.join()
+    except KeyboardInterrupt:
+        # De workers zijn daemon-threads; wat af was staat al in de state.
+        console.print(f"\n-> Ingest onderbroken. De voortgang staat in {INGEST_STATE_FILE}, draai hetzelfde commando om verder te gaan.")
+        logging.info("Ingest onderbroken.")
+        return
+
+    indexed = sum(1 for entry in entries if state.get(archive_id(entry)).get('stage') == INDEXED)
+    console.print(f"--> [bold green]✓ Ingest klaar:[/bold green] {indexed}/{len(entries)} aflevering(en) geindexeerd, "
+                  f"{counts['fouten']} fout(en).")
+    logging.info(f"Ingest klaar: {indexed}/{len(entries)} geindexeerd, {counts['fouten']} fouten.")
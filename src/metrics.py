@@ -0,0 +1,145 @@
+# src/metrics.py
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+import functools
+import contextlib
+from console import console
+
+METRICS_FILE = 'metrics.jsonl'
+# Hierin krijgen worker-processen de run mee, ook als ze niet geforkt maar gespawnd worden.
+METRICS_ENV = 'DUMPERT_METRICS'
+# Na zoveel spans wordt er tussendoor weggeschreven, zodat een lange `serve` niet blijft groeien.
+FLUSH_EVERY = 256
+
+_lock = threading.Lock()
+_pending = []
+_totals = {}
+_run = json.loads(os.environ[METRICS_ENV]) if METRICS_ENV in os.environ else None
+
+def _reset_after_fork():
+    """Een geforkt kind erft de nog niet weggeschreven spans van de ouder; die zijn niet van hem."""
+    global _lock
+    _lock = threading.Lock()
+    _pending.clear()
+    _totals.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(lambda: flush())
+
+def start_run(command, path=METRICS_FILE):
+    """
+    Begint een nieuwe run: vanaf nu worden spans bijgehouden en bij flush() of bij het
+    afsluiten als JSON-regels achteraan `path` gezet. Geeft het run-id terug.
+    """
+    global _run
+    _run = {'id': f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}", 'command': command,
+            'path': os.path.abspath(path), 'started': time.time()}
+    os.environ[METRICS_ENV] = json.dumps(_run)
+    return _run['id']
+
+def record(stage, seconds, aggregate=False, **fields):
+    """
+    Legt één meting vast. Met `aggregate` wordt alleen per fase opgeteld en komt er bij
+    flush() één regel met het aantal; bedoeld voor hete paden die per bestand lopen.
+    """
+    if _run is None:
+        return
+    with _lock:
+        if aggregate:
+            total = _totals.setdefault(stage, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] = max(total[2], seconds)
+            return
+        _pending.append({'ts': round(time.time(), 3), 'stage': stage, 'seconds': round(seconds, 6), **fields})
+        full = len(_pending) >= FLUSH_EVERY
+    if full:
+        flush()
+
+@contextlib.contextmanager
+def span(stage, aggregate=False, **fields):
+    """
+    Meet de duur van het blok als fase `stage`. Het blok krijgt `fields` terug en kan daar
+    nog velden aan toevoegen (zoals het aantal resultaten) die dan mee worden weggeschreven.
+    """
+    if _run is None:
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record(stage, time.perf_counter() - start, aggregate, **fields)
+
+def timed(stage, aggregate=False):
+    """Decorator: meet elke aanroep van de functie als fase `stage`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, aggregate):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def flush():
+    """Schrijft alle openstaande spans van dit proces weg."""
+    if _run is None:
+        return
+    with _lock:
+        entries = list(_pending)
+        entries += [{'ts': round(time.time(), 3), 'stage': stage, 'seconds': round(seconds, 6), 'count': count,
+                     'max': round(longest, 6)} for stage, (count, seconds, longest) in _totals.items()]
+        _pending.clear()
+        _totals.clear()
+    if not entries:
+        return
+    head = {'run': _run['id'], 'command': _run['command'], 'pid': os.getpid()}
+    try:
+        with open(_run['path'], 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps({**head, **entry}) + '\n' for entry in entries))
+    except OSError as e:
+        logging.warning(f"Kon metrics niet wegschrijven naar {_run['path']}: {e}")
+
+def read_run(run_id=None, path=None):
+    """Alle regels van één run (standaard de huidige) uit het metrics-bestand."""
+    run_id = run_id or (_run and _run['id'])
+    path = path or (_run and _run['path']) or METRICS_FILE
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try: entry = json.loads(line)
+                except json.JSONDecodeError: continue
+                if entry.get('run') == run_id:
+                    entries.append(entry)
+    except OSError:
+        pass
+    return entries
+
+def print_report():
+    """Toont per fase hoe vaak hij liep en hoeveel tijd erin ging, voor de huidige run."""
+    if _run is None:
+        return
+    from rich.table import Table
+    flush()
+    wall = time.time() - _run['started']
+    stages = {}
+    for entry in read_run():
+        stage = stages.setdefault(entry['stage'], {'count': 0, 'seconds': 0.0, 'max': 0.0})
+        stage['count'] += entry.get('count', 1)
+        stage['seconds'] += entry['seconds']
+        stage['max'] = max(stage['max'], entry.get('max', entry['seconds']))
+
+    table = Table(title=f"Tijd per fase voor '{_run['command']}' ({wall:.2f}s totaal)")
+    for column in ("Fase", "Aantal", "Totaal", "Gemiddeld", "Langste", "Aandeel"):
+        table.add_column(column)
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]['seconds']):
+        table.add_row(name, str(stage['count']), f"{stage['seconds']:.3f} s",
+                      f"{stage['seconds'] / stage['count'] * 1000:.1f} ms", f"{stage['max'] * 1000:.1f} ms",
+                      f"{stage['seconds'] / wall * 100:.0f}%" if wall else "-")
+    console.print(table)
+    console.print("[dim]Fasen kunnen in elkaar zitten of parallel lopen; de aandelen tellen dan niet op tot 100%.[/dim]")
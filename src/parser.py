@@ -1,189 +1,311 @@
 # src/parser.py
 import os
-import json
+import sqlite3
 import logging
-from rich.progress import track
-from rich.console import Console
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rich.progress import Progress, track
+from console import console
+from indexer import (open_index, existing_videos, find_transcripts,
+                     query_segments, query_phrase, query_all_words)
+from transcript import read_transcript, video_path_for
+import metrics
 
-console = Console(force_terminal=True)
-CACHE_FILE = 'word_database.json'
+# Zoveel transcripties gaan hoogstens in één keer naar een worker-proces.
+SCAN_CHUNK_SIZE = 16
 
-def _search_segments(json_files, search_terms):
+def _search_segments(conn, search_terms):
     """PRIORITEIT 1: Zoekt naar de exacte zin in het 'text' veld van segmenten."""
-    master_list = []
     console.print("-> [cyan]Zoekmethode: Hele segmenten (snel)[/cyan]")
-    for json_path in track(json_files, description="[green]Scannen..."):
-        logging.info(f"Scannen (segment-modus): {os.path.basename(json_path)}")
-        video_path = json_path.replace('.json', '.mp4')
-        if not os.path.exists(video_path): continue
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            try: data = json.load(f)
-            except json.JSONDecodeError: continue
-        
-        for segment in data.get('segments', []):
-            segment_text = segment.get('text', '').strip()
-            for term in search_terms:
-                if term.lower() in segment_text.lower():
-                    master_list.append({
-                        'video_path': video_path,
-                        'start_timestamp': segment['start'],
-                        'end_timestamp': segment['end'],
-                        'found_phrase': term,
-                        'context': segment_text
-                    })
-    return master_list
-
-def _search_words(json_files, search_terms):
-    """PRIORITEIT 2 (Fallback): Zoekt woord-voor-woord."""
-    master_list = []
-    console.print("-> [yellow]Fallback zoekmethode: Woord-voor-woord (langzamer)[/yellow]")
-    for json_path in track(json_files, description="[green]Scannen..."):
-        logging.info(f"Scannen (woord-modus): {os.path.basename(json_path)}")
-        video_path = json_path.replace('.json', '.mp4')
-        if not os.path.exists(video_path): continue
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            try: data = json.load(f)
-            except json.JSONDecodeError: continue
-        
-        all_words = [word for segment in data.get('segments', []) for word in segment.get('words', [])]
-        if not all_words: continue
-
-        for term in search_terms:
-            phrase_words = term.lower().split()
-            for i in range(len(all_words) - len(phrase_words) + 1):
-                json_phrase_words = [w.get('word', '').strip(".,!?").lower() for w in all_words[i:i+len(phrase_words)]]
-                if json_phrase_words == phrase_words:
-                    start_word = all_words[i]
-                    end_word = all_words[i + len(phrase_words) - 1]
-                    if 'start' in start_word and 'end' in end_word:
-                        master_list.append({
-                            'video_path': video_path,
-                            'start_timestamp': start_word['start'],
-                            'end_timestamp': end_word['end'],
-                            'found_phrase': term
-                        })
-    return master_list
-
-def find_phrases(root_dir, search_terms):
+    videos = existing_videos(conn)
+    hits = []
+    for term_idx, term in enumerate(search_terms):
+        for video_id, seg_id, start, end, text in query_segments(conn, term):
+            if video_id not in videos or start is None or end is None: continue
+            hits.append(((video_id, seg_id, term_idx), {
+                'video_path': videos[video_id],
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': term,
+                'context': text
+            }))
+    hits.sort(key=lambda hit: hit[0])
+    return [clip for _, clip in hits]
+
+def _search_words(conn, search_terms):
+    """PRIORITEIT 2 (Fallback): Zoekt woord-voor-woord via de positionele postings."""
+    console.print("-> [yellow]Fallback zoekmethode: Woord-voor-woord[/yellow]")
+    videos = existing_videos(conn)
+    hits = []
+    for term_idx, term in enumerate(search_terms):
+        phrase_words = term.lower().split()
+        if not phrase_words: continue
+        for video_id, _, pos, start, end in query_phrase(conn, phrase_words):
+            if video_id not in videos or start is None or end is None: continue
+            hits.append(((video_id, term_idx, pos), {
+                'video_path': videos[video_id],
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': term
+            }))
+    hits.sort(key=lambda hit: hit[0])
+    return [clip for _, clip in hits]
+
+def _scan_chunk(scan_file, json_paths, *args):
+    """Draait in een worker-proces: scant een reeks bestanden en geeft per bestand de hits."""
+    hits = [scan_file(json_path, *args) for json_path in json_paths]
+    # Een worker-proces ruimt niet netjes op; zijn metingen moeten nu weg.
+    metrics.flush()
+    return hits
+
+@metrics.timed('scannen')
+def _scan_files(scan_file, json_files, args, jobs=None):
+    """
+    Voert scan_file(json_path, *args) uit voor alle transcripties. Met meerdere cores gaat dat
+    in blokken van SCAN_CHUNK_SIZE bestanden over een procespool; de voortgang loopt in dit
+    proces en de resultaten komen terug in de volgorde van json_files, net als bij één core.
+    Geeft per bestand de lijst met hits.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(json_files) <= SCAN_CHUNK_SIZE:
+        return [scan_file(json_path, *args) for json_path in track(json_files, description="[green]Scannen...", console=console)]
+
+    chunk_size = max(1, min(SCAN_CHUNK_SIZE, len(json_files) // (jobs * 4)))
+    per_file = [None] * len(json_files)
+    with Progress(*Progress.get_default_columns(), console=console) as progress:
+        task = progress.add_task("[green]Scannen...", total=len(json_files))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_scan_chunk, scan_file, json_files[i:i + chunk_size], *args): i
+                       for i in range(0, len(json_files), chunk_size)}
+            for future in as_completed(futures):
+                i = futures[future]
+                hits = future.result()
+                per_file[i:i + len(hits)] = hits
+                progress.advance(task, len(hits))
+    logging.info(f"{len(json_files)} transcripties gescand met {jobs} processen.")
+    return per_file
+
+def _scan_file_segments(json_path, search_terms, cache):
+    """Zoekt zonder index in het 'text' veld van de segmenten van één transcriptie."""
+    logging.info(f"Scannen (segment-modus): {os.path.basename(json_path)}")
+    video_path = video_path_for(json_path)
+    if not os.path.exists(video_path): return []
+
+    transcript = read_transcript(json_path, cache)
+    if transcript is None: return []
+
+    hits = []
+    terms_lower = [term.lower() for term in search_terms]
+    for start, end, segment_text in transcript.segments:
+        segment_lower = segment_text.lower()
+        for term, term_lower in zip(search_terms, terms_lower):
+            if term_lower in segment_lower:
+                hits.append({
+                    'video_path': video_path,
+                    'start_timestamp': start,
+                    'end_timestamp': end,
+                    'found_phrase': term,
+                    'context': segment_text
+                })
+    return hits
+
+def _scan_segments(json_files, search_terms, cache=True, jobs=None):
+    """Zoekt zonder index in het 'text' veld van segmenten."""
+    console.print("-> [cyan]Zoekmethode: Hele segmenten (zonder index)[/cyan]")
+    return [clip for hits in _scan_files(_scan_file_segments, json_files, (search_terms, cache), jobs) for clip in hits]
+
+def _scan_file_words(json_path, search_terms, cache):
+    """Zoekt zonder index woord-voor-woord in één transcriptie, met één doorloop voor alle termen."""
+    logging.info(f"Scannen (woord-modus): {os.path.basename(json_path)}")
+    video_path = video_path_for(json_path)
+    if not os.path.exists(video_path): return []
+
+    transcript = read_transcript(json_path, cache)
+    if transcript is None: return []
+
+    phrases = [term.lower().split() for term in search_terms]
+    hits = []
+    # Eerst alle hits van de eerste term, dan de tweede, enzovoort.
+    for term_idx, pos in sorted((term_idx, pos) for pos, term_idx in transcript.match_phrases(phrases)):
+        start = transcript.starts[pos]
+        end = transcript.ends[pos + len(phrases[term_idx]) - 1]
+        if start is not None and end is not None:
+            hits.append({
+                'video_path': video_path,
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': search_terms[term_idx]
+            })
+    return hits
+
+def _scan_words(json_files, search_terms, cache=True, jobs=None):
+    """Zoekt zonder index woord-voor-woord."""
+    console.print("-> [yellow]Fallback zoekmethode: Woord-voor-woord (zonder index, langzamer)[/yellow]")
+    return [clip for hits in _scan_files(_scan_file_words, json_files, (search_terms, cache), jobs) for clip in hits]
+
+def find_phrases(root_dir, search_terms, jobs=None):
     """
     Vindt zinnen door eerst op hele segmenten te zoeken en dan als fallback woord-voor-woord.
+    Het bijwerken van de index, of zonder index het scannen, gebeurt met `jobs` processen
+    (standaard: alle cores).
     """
     logging.info(f"Zoeken naar: {', '.join(f'\"{t}\"' for t in search_terms)}")
-    json_files = [os.path.join(subdir, file) 
-                  for subdir, _, files in os.walk(root_dir) 
-                  for file in files if file.endswith('.json')]
-    
-    results = _search_segments(json_files, search_terms)
-    
+    try:
+        conn = open_index(root_dir, jobs)
+    except sqlite3.Error as e:
+        console.print(f"[yellow]Index niet beschikbaar ({e}), transcripties worden direct gescand.[/yellow]")
+        logging.warning(f"Index niet beschikbaar: {e}")
+        json_files = find_transcripts(root_dir)
+        results = _scan_segments(json_files, search_terms, jobs=jobs)
+        if not results:
+            results = _scan_words(json_files, search_terms, jobs=jobs)
+        return results
+
+    results = search_phrases(conn, search_terms)
+    conn.close()
+    return results
+
+@metrics.timed('zoeken (zoek)')
+def search_phrases(conn, search_terms):
+    """find_phrases op een al geopende index."""
+    results = _search_segments(conn, search_terms)
     if not results:
         console.print("[yellow]Niks gevonden in segmenten, fallback naar woord-voor-woord zoeken...[/yellow]")
         logging.warning("Niks gevonden in segmenten, fallback naar woord-voor-woord zoeken.")
-        results = _search_words(json_files, search_terms)
+        results = _search_words(conn, search_terms)
     return results
 
+def _scan_file_word_database(json_path, cache):
+    """Alle woorden met tijden uit één transcriptie, als (woord, clip)."""
+    video_path = video_path_for(json_path)
+    if not os.path.exists(video_path): return []
+
+    transcript = read_transcript(json_path, cache)
+    if transcript is None: return []
+
+    return [(word, {
+                'video_path': video_path,
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': word
+            })
+            for word, start, end in zip(transcript.words, transcript.starts, transcript.ends)
+            if word and start is not None and end is not None]
+
+def _scan_word_database(json_files, cache=True, jobs=None):
+    """Bouwt de woorden-database zonder index door alle transcripties te lezen."""
+    word_db = {}
+    for hits in _scan_files(_scan_file_word_database, json_files, (cache,), jobs):
+        for word, clip in hits:
+            if word not in word_db:
+                word_db[word] = []
+            word_db[word].append(clip)
+    return word_db
+
 def build_word_database(root_dir):
     """
-    Scant .json bestanden en bouwt een database van elk uniek woord.
-    Gebruikt een cache-bestand om herhaaldelijk scannen te versnellen.
+    Bouwt een database van elk uniek woord met al zijn voorkomens.
+    Leest uit de woorden-index, zodat transcripties niet opnieuw gescand hoeven te worden.
     """
-    json_files = [os.path.join(subdir, file) 
-                  for subdir, _, files in os.walk(root_dir) 
-                  for file in files if file.endswith('.json')]
-    
-    cache_is_valid = False
-    if os.path.exists(CACHE_FILE):
-        cache_mtime = os.path.getmtime(CACHE_FILE)
-        latest_transcript_mtime = 0
-        if json_files:
-            latest_transcript_mtime = max(os.path.getmtime(f) for f in json_files)
-
-        if cache_mtime > latest_transcript_mtime:
-            console.print("-> [green]Actuele woorden-database cache gevonden. Laden...[/green]")
-            logging.info("Actuele cache gevonden, laden vanuit word_database.json.")
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                word_db = json.load(f)
-            console.print(f"--> [bold green]✓ Database geladen met {len(word_db)} unieke woorden.[/bold green]")
-            return word_db
-
-    console.print("-> [yellow]Geen (actuele) cache gevonden. Woorden-database wordt volledig opnieuw gebouwd...[/yellow]")
-    
-    word_db = {}
-    for json_path in track(json_files, description="[green]Woorden indexeren..."):
-        video_path = json_path.replace('.json', '.mp4')
-        if not os.path.exists(video_path): continue
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            try: data = json.load(f)
-            except json.JSONDecodeError: continue
-        
-        all_words_in_file = [word for segment in data.get('segments', []) for word in segment.get('words', [])]
-        
-        for word_info in all_words_in_file:
-            if 'word' in word_info and 'start' in word_info and 'end' in word_info:
-                word = word_info['word'].strip(".,!?").lower()
-                if not word: continue
-                
-                if word not in word_db:
-                    word_db[word] = []
-                
-                word_db[word].append({
-                    'video_path': video_path,
-                    'start_timestamp': word_info['start'],
-                    'end_timestamp': word_info['end'],
-                    'found_phrase': word
-                })
+    try:
+        conn = open_index(root_dir)
+    except sqlite3.Error as e:
+        console.print(f"[yellow]Index niet beschikbaar ({e}), transcripties worden direct gescand.[/yellow]")
+        logging.warning(f"Index niet beschikbaar: {e}")
+        word_db = _scan_word_database(find_transcripts(root_dir))
+        console.print(f"--> [bold green]✓ Database gebouwd met {len(word_db)} unieke woorden.[/bold green]")
+        return word_db
 
-    console.print(f"--> [bold green]✓ Database gebouwd met {len(word_db)} unieke woorden.[/bold green]")
-    console.print(f"-> Opslaan naar cache-bestand: {CACHE_FILE}...")
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(word_db, f)
-    logging.info(f"Woorden-database opgeslagen in cache: {CACHE_FILE}")
+    videos = existing_videos(conn)
+    word_db = {}
+    for word, video_id, start, end in query_all_words(conn):
+        if video_id not in videos: continue
+        if word not in word_db:
+            word_db[word] = []
+        word_db[word].append({
+            'video_path': videos[video_id],
+            'start_timestamp': start,
+            'end_timestamp': end,
+            'found_phrase': word
+        })
+    conn.close()
 
+    console.print(f"--> [bold green]✓ Database geladen met {len(word_db)} unieke woorden.[/bold green]")
     return word_db
 
-def find_precise_clips(root_dir, search_terms):
+def _scan_file_precise_clips(json_path, search_terms, cache):
+    """Zoekt zonder index naar precieze woordfragmenten binnen de segmenten van één transcriptie."""
+    logging.info(f"Scannen (precisie-modus): {os.path.basename(json_path)}")
+    video_path = video_path_for(json_path)
+    if not os.path.exists(video_path): return []
+
+    transcript = read_transcript(json_path, cache)
+    if transcript is None: return []
+
+    terms_lower = [term.lower() for term in search_terms]
+    phrases = [term_lower.split() for term_lower in terms_lower]
+    # Per segment en term telt alleen de eerste match, en alleen als de segmenttekst de term letterlijk bevat.
+    first_hits = {}
+    for pos, term_idx in transcript.match_phrases(phrases, same_segment=True):
+        first_hits.setdefault((transcript.seg_ids[pos], term_idx), pos)
+    hits = []
+    for (seg_id, term_idx), pos in sorted(first_hits.items()):
+        if terms_lower[term_idx] not in transcript.segments[seg_id][2].lower(): continue
+        start = transcript.starts[pos]
+        end = transcript.ends[pos + len(phrases[term_idx]) - 1]
+        if start is not None and end is not None:
+            hits.append({
+                'video_path': video_path,
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': search_terms[term_idx]
+            })
+    return hits
+
+def _scan_precise_clips(json_files, search_terms, cache=True, jobs=None):
+    """Zoekt zonder index naar precieze woordfragmenten binnen segmenten."""
+    return [clip for hits in _scan_files(_scan_file_precise_clips, json_files, (search_terms, cache), jobs) for clip in hits]
+
+def find_precise_clips(root_dir, search_terms, jobs=None):
     """
     Zoekt naar termen in segmenten en retourneert de PRECIEZE start/end tijden
-    van de gevonden woorden binnen dat segment.
+    van de gevonden woorden binnen dat segment. De index wordt bijgewerkt (of zonder index
+    wordt er gescand) met `jobs` processen.
     """
-    master_list = []
     console.print("-> [cyan]Zoekmethode: Chirurgisch (precisie)[/cyan]")
-    
-    json_files = [os.path.join(subdir, file) 
-                  for subdir, _, files in os.walk(root_dir) 
-                  for file in files if file.endswith('.json')]
-
-    for json_path in track(json_files, description="[green]Scannen..."):
-        logging.info(f"Scannen (precisie-modus): {os.path.basename(json_path)}")
-        video_path = json_path.replace('.json', '.mp4')
-        if not os.path.exists(video_path): continue
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            try: data = json.load(f)
-            except json.JSONDecodeError: continue
-
-        for segment in data.get('segments', []):
-            segment_text = segment.get('text', '').strip().lower()
-            segment_words = segment.get('words', [])
-            if not segment_words: continue
-
-            for term in search_terms:
-
-                if term.lower() in segment_text:
-                    term_words = term.lower().split()
-                    for i in range(len(segment_words) - len(term_words) + 1):
-                        phrase_to_check = [w.get('word', '').strip(".,!?").lower() for w in segment_words[i:i+len(term_words)]]
-                        if phrase_to_check == term_words:
-                            start_word_obj = segment_words[i]
-                            end_word_obj = segment_words[i + len(term_words) - 1]
-                            if 'start' in start_word_obj and 'end' in end_word_obj:
-                                master_list.append({
-                                    'video_path': video_path,
-                                    'start_timestamp': start_word_obj['start'],
-                                    'end_timestamp': end_word_obj['end'],
-                                    'found_phrase': term
-                                })
-                            break
-    return master_list
\ No newline at end of file
+    try:
+        conn = open_index(root_dir, jobs)
+    except sqlite3.Error as e:
+        console.print(f"[yellow]Index niet beschikbaar ({e}), transcripties worden direct gescand.[/yellow]")
+        logging.warning(f"Index niet beschikbaar: {e}")
+        return _scan_precise_clips(find_transcripts(root_dir), search_terms, jobs=jobs)
+
+    results = search_precise_clips(conn, search_terms)
+    conn.close()
+    return results
+
+@metrics.timed('zoeken (kut)')
+def search_precise_clips(conn, search_terms):
+    """find_precise_clips op een al geopende index."""
+    videos = existing_videos(conn)
+    hits = []
+    for term_idx, term in enumerate(search_terms):
+        term_words = term.lower().split()
+        if not term_words: continue
+        # Alleen segmenten waarvan de tekst de term letterlijk bevat tellen mee.
+        candidate_segments = {(video_id, seg_id) for video_id, seg_id, *_ in query_segments(conn, term)}
+        seen_segments = set()
+        for video_id, seg_id, _, start, end in query_phrase(conn, term_words, same_segment=True):
+            key = (video_id, seg_id)
+            # Per segment telt alleen de eerste match, net als bij het scannen.
+            if key in seen_segments: continue
+            seen_segments.add(key)
+            if key not in candidate_segments or video_id not in videos: continue
+            if start is None or end is None: continue
+            hits.append(((video_id, seg_id, term_idx), {
+                'video_path': videos[video_id],
+                'start_timestamp': start,
+                'end_timestamp': end,
+                'found_phrase': term
+            }))
+    hits.sort(key=lambda hit: hit[0])
+    return [clip for _, clip in hits]
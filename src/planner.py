@@ -0,0 +1,113 @@
+# src/planner.py
+import logging
+from collections import Counter
+import numpy as np
+import metrics
+
+def _word_table(word_db, word, min_length, max_length, rng):
+    """
+    Postings van één woord, gegroepeerd per video. Geeft de posting-indices in groepsvolgorde,
+    het aantal bruikbare postings per video en waar elke groep begint.
+    """
+    video_ids, starts, ends = word_db.postings(word)
+    durations = ends - starts
+    keep = np.ones(len(video_ids), dtype=bool)
+    if min_length is not None:
+        keep &= durations >= min_length
+    if max_length is not None:
+        keep &= durations <= max_length
+    index = np.flatnonzero(keep)
+    # Binnen een video in willekeurige volgorde, zodat elke run andere voorkomens kiest.
+    order = index[np.lexsort((rng.random(len(index)), video_ids[index]))]
+    counts = np.bincount(video_ids[order], minlength=word_db.n_paths)
+    group_start = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return {'order': order, 'counts': counts, 'group_start': group_start,
+            'starts': starts, 'ends': ends}
+
+def _word_matrix(word_db, words, min_length=None, max_length=None, seed=None):
+    rng = np.random.default_rng(seed)
+    need = Counter(words)
+    unique = list(need)
+    tables = [_word_table(word_db, word, min_length, max_length, rng) for word in unique]
+    available = np.stack([table['counts'] for table in tables], axis=1).astype(np.int64)
+    multiplicity = np.array([need[word] for word in unique], dtype=np.int64)
+    return unique, tables, available, multiplicity
+
+def max_sentences(word_db, words, min_length=None, max_length=None):
+    """Hoeveel zinnen er te bouwen zijn zonder een voorkomen twee keer te gebruiken."""
+    _, _, available, multiplicity = _word_matrix(word_db, words, min_length, max_length)
+    return int((available.sum(axis=0) // multiplicity).min())
+
+@metrics.timed('zinnen plannen')
+def plan_sentences(word_db, words, n_sentences, min_length=None, max_length=None, seed=None):
+    """
+    Kiest voor n_sentences zinnen per woord een voorkomen, zonder hergebruik en met zo min
+    mogelijk verschillende bronvideo's. Werkt op een matrix (video x woord) met het aantal
+    beschikbare voorkomens:
+      1. video's die zelf hele zinnen kunnen leveren gaan eerst, in één keer voor alle zinnen;
+      2. de rest wordt per zin gretig gevuld vanuit de video die de meeste ontbrekende woorden
+         heeft, met voorkeur voor video's die al in de render zitten.
+    Geeft een lijst zinnen, elk een lijst clip-dicts in de volgorde van `words`.
+    """
+    unique, tables, available, multiplicity = _word_matrix(word_db, words, min_length, max_length, seed)
+    n_sentences = min(n_sentences, int((available.sum(axis=0) // multiplicity).min()))
+    used = np.zeros_like(available)
+    # Per zin en per uniek woord de video's waar de voorkomens vandaan komen.
+    slots = []
+
+    # Stap 1: hele zinnen uit één video.
+    full = (available // multiplicity).min(axis=1)
+    candidates = np.argsort(-full, kind='stable')
+    candidates = candidates[full[candidates] > 0]
+    per_video = full[candidates]
+    before = np.cumsum(per_video) - per_video
+    take = np.clip(n_sentences - before, 0, per_video)
+    used[candidates] += take[:, None] * multiplicity
+    for video in np.repeat(candidates, take):
+        slots.append([[int(video)] * int(m) for m in multiplicity])
+
+    # Stap 2: de resterende zinnen gretig samenstellen.
+    opened = np.zeros(len(available), dtype=np.int64)
+    opened[candidates[take > 0]] = 1
+    for _ in range(n_sentences - len(slots)):
+        remaining = multiplicity.copy()
+        sentence = [[] for _ in unique]
+        while remaining.any():
+            can = np.minimum(available - used, remaining)
+            covered = can.sum(axis=1)
+            video = int(np.argmax(covered * 2 + opened))
+            used[video] += can[video]
+            remaining -= can[video]
+            opened[video] = 1
+            for j in np.flatnonzero(can[video]):
+                sentence[j].extend([video] * int(can[video, j]))
+        slots.append(sentence)
+
+    # Voorkomens toewijzen: per (woord, video) de volgende ongebruikte uit de groep.
+    cursors = [np.zeros(len(available), dtype=np.int64) for _ in unique]
+    position = {word: j for j, word in enumerate(unique)}
+    plan = []
+    for sentence in slots:
+        taken = [0] * len(unique)
+        clips = []
+        for word in words:
+            j = position[word]
+            table = tables[j]
+            video = sentence[j][taken[j]]
+            taken[j] += 1
+            posting = table['order'][table['group_start'][video] + cursors[j][video]]
+            cursors[j][video] += 1
+            clips.append({
+                'video_path': word_db.path(video),
+                'start_timestamp': round(float(table['starts'][posting]), 3),
+                'end_timestamp': round(float(table['ends'][posting]), 3),
+                'found_phrase': word
+            })
+        plan.append(clips)
+
+    if plan:
+        per_sentence = np.mean([len({clip['video_path'] for clip in clips}) for clips in plan])
+        total = len({clip['video_path'] for clips in plan for clip in clips})
+        logging.info(f"Zinsplan: {len(plan)} zinnen uit {total} video's, "
+                     f"gemiddeld {per_sentence:.2f} video's per zin.")
+    return plan
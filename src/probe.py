@@ -0,0 +1,188 @@
+# src/probe.py
+import os
+import json
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from console import console
+from rich.progress import Progress
+
+# Streamgegevens (goedkoop, elke render) en keyframes (een scan over het hele bestand, alleen
+# voor --draft) staan in aparte bestanden naast de video, zodat de dure scan alleen draait
+# als iemand de keyframes echt opvraagt.
+PROBE_SUFFIX = '.probe'
+KEYFRAMES_SUFFIX = '.keyframes'
+PROBE_VERSION = 2
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+def probe_path(video_path, suffix=PROBE_SUFFIX):
+    """Het metadata-bestand hoort naast de video en de transcriptie."""
+    return os.path.splitext(video_path)[0] + suffix
+
+def _ffprobe_json(args):
+    output = subprocess.run(['ffprobe', '-v', 'error', *args, '-of', 'json'],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def _fraction(value, default=0.0):
+    try:
+        num, _, den = str(value).partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return default
+
+def _probe(video_path):
+    """Draait ffprobe over de container- en streamgegevens van een video."""
+    info = _ffprobe_json(['-show_entries',
+                          'format=duration,start_time:stream=index,codec_type,codec_name,width,height,pix_fmt,'
+                          'sample_aspect_ratio,avg_frame_rate,r_frame_rate,sample_rate,channels,channel_layout',
+                          video_path])
+    fmt = info.get('format', {})
+    offset = float(fmt.get('start_time') or 0.0)
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    result = {
+        'version': PROBE_VERSION,
+        'duration': float(fmt.get('duration') or 0.0),
+        'video': None,
+        'audio': None,
+    }
+    if audio:
+        result['audio'] = {
+            'codec': audio.get('codec_name'),
+            'sample_rate': int(audio.get('sample_rate') or 0),
+            'channels': int(audio.get('channels') or 0),
+            'channel_layout': audio.get('channel_layout'),
+        }
+    if video:
+        result['video'] = {
+            'codec': video.get('codec_name'),
+            'width': int(video.get('width') or 0),
+            'height': int(video.get('height') or 0),
+            'pix_fmt': video.get('pix_fmt'),
+            'sar': video.get('sample_aspect_ratio') or '1:1',
+            'fps': _fraction(video.get('avg_frame_rate')) or _fraction(video.get('r_frame_rate')),
+        }
+    return result
+
+def _probe_keyframes(video_path):
+    """
+    De tijden van alle keyframes van de eerste videostream, ten opzichte van het begin van
+    de container. Alleen packet-headers worden gelezen, niets gedecodeerd.
+    """
+    result = {'version': PROBE_VERSION, 'keyframes': [], 'gop_frames': []}
+    fmt = _ffprobe_json(['-show_entries', 'format=start_time', video_path]).get('format', {})
+    offset = float(fmt.get('start_time') or 0.0)
+    packets = _ffprobe_json(['-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags', video_path])
+    times = sorted((float(p['pts_time']) - offset, 'K' in p.get('flags', ''))
+                   for p in packets.get('packets', []) if p.get('pts_time') not in (None, 'N/A'))
+    # Per keyframe het aantal frames tot de volgende, zodat een stream-copy op frames begrensd kan worden.
+    for t, key in times:
+        if key:
+            result['keyframes'].append(round(t, 6))
+            result['gop_frames'].append(0)
+        if result['gop_frames']:
+            result['gop_frames'][-1] += 1
+    return result
+
+def _is_current(info, stat):
+    return (info is not None and info.get('version') == PROBE_VERSION
+            and info.get('mtime') == stat.st_mtime and info.get('size') == stat.st_size)
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _cached(video_path, suffix, build, refresh):
+    """
+    Leest de metadata uit het bestand met `suffix` naast de video, of bouwt hem met
+    build(video_path) opnieuw op als de video veranderd is (mtime of grootte).
+    """
+    key = (os.path.abspath(video_path), suffix)
+    stat = os.stat(video_path)
+    with _memo_lock:
+        info = _memo.get(key)
+    if not refresh and _is_current(info, stat):
+        return info
+
+    path = probe_path(video_path, suffix)
+    info = None if refresh else _read(path)
+    if not _is_current(info, stat):
+        info = build(video_path)
+        info['mtime'], info['size'] = stat.st_mtime, stat.st_size
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(tmp_path, path)
+        logging.info(f"Metadata opgebouwd voor {os.path.basename(video_path)}: {os.path.basename(path)}.")
+    with _memo_lock:
+        _memo[key] = info
+    return info
+
+def video_info(video_path, refresh=False):
+    """
+    Geeft de container- en streamgegevens van een video (duur, resolutie, pixelformaat,
+    audio). Wordt één keer met ffprobe opgebouwd en daarna uit het .probe bestand gelezen.
+    """
+    return _cached(video_path, PROBE_SUFFIX, _probe, refresh)
+
+def keyframe_info(video_path, refresh=False):
+    """
+    Geeft {'keyframes': [...], 'gop_frames': [...]} van een video. Hiervoor wordt het hele
+    bestand gescand; alleen --draft heeft het nodig. Gecachet in het .keyframes bestand.
+    """
+    return _cached(video_path, KEYFRAMES_SUFFIX, _probe_keyframes, refresh)
+
+def find_videos(root_dir):
+    return sorted(os.path.join(subdir, file)
+                  for subdir, _, files in os.walk(root_dir)
+                  for file in files if file.endswith('.mp4'))
+
+def reindex(root_dir, jobs=1, force=False, keyframes=False):
+    """
+    Brengt de .probe bestanden onder root_dir bij, en met keyframes ook de .keyframes
+    bestanden: nieuwe en gewijzigde video's worden opnieuw geprobed, bestanden zonder
+    video worden opgeruimd.
+    """
+    videos = find_videos(root_dir)
+    steps = [(PROBE_SUFFIX, video_info)] + ([(KEYFRAMES_SUFFIX, keyframe_info)] if keyframes else [])
+    stale = []
+    for video_path in videos:
+        stat = os.stat(video_path)
+        for suffix, probe_video in steps:
+            if force or not _is_current(_read(probe_path(video_path, suffix)), stat):
+                stale.append((video_path, probe_video))
+
+    removed = 0
+    for subdir, _, files in os.walk(root_dir):
+        for file in files:
+            for suffix in (PROBE_SUFFIX, KEYFRAMES_SUFFIX):
+                if file.endswith(suffix) and not os.path.exists(os.path.join(subdir, file[:-len(suffix)] + '.mp4')):
+                    os.remove(os.path.join(subdir, file))
+                    removed += 1
+
+    console.print(f"Metadata bijwerken: {len(stale)} bestand(en) voor {len(videos)} video's, {removed} verweesd bestand(en) verwijderd.")
+    failed = 0
+    if stale:
+        with Progress(console=console) as progress:
+            task = progress.add_task("[cyan]Proben...", total=len(stale))
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(probe_video, video_path, True): video_path for video_path, probe_video in stale}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+                        failed += 1
+                        console.print(f"[red]✗ {os.path.basename(futures[future])}: {e}[/red]")
+                        logging.error(f"Proben mislukt voor {futures[future]}: {e}")
+                    progress.advance(task)
+    logging.info(f"Reindex {root_dir}: {len(stale) - failed} bijgewerkt, {failed} mislukt, {removed} verwijderd.")
+    return len(stale) - failed, failed, removed
@@ -0,0 +1,177 @@
+# src/separator.py
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import subprocess
+import threading
+
+STEMS_DIR = 'stems'
+STEMS_INDEX = os.path.join(STEMS_DIR, 'index.json')
+STEMS_INDEX_LOCK = os.path.join(STEMS_DIR, 'index.lock')
+DEMUCS_MODEL = 'htdemucs'
+CHUNK_SECONDS = 30.0
+OVERLAP_SECONDS = 2.0
+
+_model = None
+_model_lock = threading.Lock()
+
+def _load_model():
+    """Laadt het demucs-model één keer per proces."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            try:
+                import torch
+                from demucs.pretrained import get_model
+            except ImportError as e:
+                raise RuntimeError(f"Demucs-modus heeft demucs en torch nodig ({e}). Draai ./setup.sh opnieuw.") from e
+            model = get_model(DEMUCS_MODEL)
+            model.to('cuda' if torch.cuda.is_available() else 'cpu')
+            model.eval()
+            _model = model
+            logging.info(f"Demucs-model '{DEMUCS_MODEL}' geladen.")
+    return _model
+
+def video_hash(video_file):
+    """
+    SHA-256 van de inhoud van een video. Wordt per (pad, mtime, grootte) onthouden
+    in stems/index.json, zodat een video niet bij elke run opnieuw gehasht wordt.
+    """
+    stat = os.stat(video_file)
+    key = os.path.abspath(video_file)
+    entry = _read_index().get(key)
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(video_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': digest.hexdigest()}
+    _store_hash(key, entry)
+    return entry['sha256']
+
+def _read_index():
+    try:
+        with open(STEMS_INDEX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _store_hash(key, entry):
+    """
+    Voegt één hash toe aan stems/index.json. Met meerdere workers (ingest -t, transcribe --jobs)
+    gebeurt dat tegelijk, dus onder een bestandslock die ook tussen processen werkt: opnieuw
+    inlezen, aanvullen en via een tijdelijk bestand vervangen, zodat er niets verloren gaat
+    en de index nooit half geschreven is.
+    """
+    os.makedirs(STEMS_DIR, exist_ok=True)
+    with open(STEMS_INDEX_LOCK, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        known = _read_index()
+        known[key] = entry
+        tmp_path = f"{STEMS_INDEX}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(known, f, indent=1)
+        os.replace(tmp_path, STEMS_INDEX)
+
+def _read_exact(stream, size):
+    """Leest precies `size` bytes (of minder aan het einde van de stream)."""
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def _separate_to_wav(video_file, output_wav):
+    """
+    Draait demucs in blokken van CHUNK_SECONDS met OVERLAP_SECONDS overlap. ffmpeg decodeert
+    de mix blok voor blok via een pipe en een tweede ffmpeg schrijft de zang als 16 kHz mono wav,
+    dus het geheugengebruik hangt af van de blokgrootte en niet van de lengte van de aflevering.
+    """
+    import numpy as np
+    import torch
+    from demucs.apply import apply_model
+
+    model = _load_model()
+    device = next(model.parameters()).device
+    rate, channels = model.samplerate, model.audio_channels
+    vocals_index = model.sources.index('vocals')
+    chunk = int(CHUNK_SECONDS * rate)
+    overlap = int(OVERLAP_SECONDS * rate)
+    frame_bytes = 4 * channels
+    fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[None, :]
+
+    reader = subprocess.Popen(
+        ['ffmpeg', '-nostdin', '-i', video_file, '-vn', '-ac', str(channels), '-ar', str(rate),
+         '-f', 'f32le', '-hide_banner', '-loglevel', 'error', '-'],
+        stdout=subprocess.PIPE)
+    writer = subprocess.Popen(
+        ['ffmpeg', '-y', '-f', 'f32le', '-ac', str(channels), '-ar', str(rate), '-i', '-',
+         '-ac', '1', '-ar', '16000', '-c:a', 'pcm_s16le', '-hide_banner', '-loglevel', 'error', output_wav],
+        stdin=subprocess.PIPE)
+    try:
+        carry_mix = np.zeros((channels, 0), dtype=np.float32)
+        carry_vocals = None
+        while True:
+            raw = _read_exact(reader.stdout, (chunk - carry_mix.shape[1]) * frame_bytes)
+            fresh = np.frombuffer(raw, dtype=np.float32).reshape(-1, channels).T
+            if fresh.shape[1] == 0:
+                # De lengte was precies een veelvoud van de blokken: alleen de overlap staat nog open.
+                if carry_vocals is not None:
+                    writer.stdin.write(np.ascontiguousarray(carry_vocals.T).tobytes())
+                break
+            mix = np.concatenate([carry_mix, fresh], axis=1)
+            # Normaliseren per blok, zoals demucs dat voor een hele track doet.
+            ref = mix.mean(axis=0)
+            mean, std = float(ref.mean()), float(ref.std()) or 1.0
+            tensor = torch.from_numpy((mix - mean) / std)[None].to(device)
+            with torch.no_grad():
+                sources = apply_model(model, tensor, shifts=0, split=True, overlap=0.25, progress=False)
+            vocals = sources[0, vocals_index].cpu().numpy() * std + mean
+
+            if carry_vocals is not None:
+                # Crossfade over het overlappende stuk met het vorige blok.
+                n = carry_vocals.shape[1]
+                vocals[:, :n] = carry_vocals * (1.0 - fade_in[:, :n]) + vocals[:, :n] * fade_in[:, :n]
+            last = fresh.shape[1] < chunk - carry_mix.shape[1]
+            keep = 0 if last else min(overlap, vocals.shape[1])
+            writer.stdin.write(np.ascontiguousarray(vocals[:, :vocals.shape[1] - keep].T).tobytes())
+            if last:
+                break
+            carry_mix = mix[:, mix.shape[1] - keep:]
+            carry_vocals = vocals[:, vocals.shape[1] - keep:]
+        writer.stdin.close()
+        if writer.wait() != 0 or reader.wait() != 0:
+            raise RuntimeError(f"ffmpeg faalde tijdens scheiden van {os.path.basename(video_file)}")
+    finally:
+        for process in (reader, writer):
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+def separate_vocals(video_file):
+    """
+    Geeft het pad naar de zang-stem (16 kHz mono wav) van een video. Stems worden gecached
+    op de inhoud-hash van de video, dus opnieuw transcriberen met een andere prompt of een
+    ander model betaalt niet nog eens voor het scheiden.
+    """
+    stem_path = os.path.join(STEMS_DIR, f"{video_hash(video_file)}.vocals.wav")
+    if os.path.exists(stem_path):
+        logging.info(f"Gecachte zang-stem gebruikt voor {os.path.basename(video_file)}: {stem_path}")
+        return stem_path
+    os.makedirs(STEMS_DIR, exist_ok=True)
+    tmp_path = f"{stem_path}.tmp.wav"
+    try:
+        _separate_to_wav(video_file, tmp_path)
+        os.replace(tmp_path, stem_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logging.info(f"Zang-stem opgeslagen voor {os.path.basename(video_file)}: {stem_path}")
+    return stem_path
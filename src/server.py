@@ -0,0 +1,160 @@
+# src/server.py
+import os
+import json
+import time
+import socket
+import logging
+
+SOCKET_FILE = 'dumpert.sock'
+# Zo vaak kijkt de server of er transcripties bij zijn gekomen of veranderd.
+WATCH_INTERVAL = 5.0
+CLIENT_TIMEOUT = 60.0
+
+def query(op, root_dir, socket_path=SOCKET_FILE, **args):
+    """
+    Stuurt één verzoek naar een draaiende `serve`. Geeft None als er geen server draait,
+    hij een andere map bedient of het verzoek mislukt; de aanroeper doet het werk dan zelf.
+    Bewust zonder zware imports, zodat de client-kant goedkoop blijft.
+    """
+    if not os.path.exists(socket_path):
+        return None
+    request = {'op': op, 'root_dir': os.path.abspath(root_dir), **args}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as stream:
+                line = stream.readline()
+    except OSError as e:
+        logging.info(f"Geen query-server bereikbaar op {socket_path} ({e}), werk wordt lokaal gedaan.")
+        return None
+    try:
+        response = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not response.get('ok'):
+        logging.warning(f"Query-server weigerde '{op}': {response.get('error')}")
+        return None
+    logging.info(f"'{op}' beantwoord door de query-server in {response.get('ms', 0):.1f} ms.")
+    return response['result']
+
+def _socket_alive(socket_path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def serve(root_dir, socket_path=SOCKET_FILE, watch_interval=WATCH_INTERVAL):
+    """
+    Houdt de woorden-index en de woorden-database open achter een Unix-socket.
+    Protocol: per regel een JSON-verzoek {"op": ..., "root_dir": ..., ...}, per regel een
+    JSON-antwoord {"ok": true, "result": ...} of {"ok": false, "error": ...}.
+    """
+    import signal
+    import socketserver
+    from indexer import open_index, update_index, find_transcripts, index_generation
+    from parser import search_phrases, search_precise_clips
+    from worddb import open_word_database
+    from fuzzy import open_fuzzy_index
+    from planner import plan_sentences, max_sentences
+    import metrics
+    from console import console
+
+    root = os.path.abspath(root_dir)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                started = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    result = self.server.dispatch(request)
+                    response = {'ok': True, 'result': result}
+                except Exception as e:
+                    logging.exception("Verzoek aan de query-server mislukt")
+                    response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                response['ms'] = (time.perf_counter() - started) * 1000
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                self.wfile.flush()
+                metrics.flush()
+
+    class QueryServer(socketserver.UnixStreamServer):
+        """Eén thread: verzoeken en het bijwerken van de index lopen nooit door elkaar."""
+
+        def __init__(self):
+            self.conn = open_index(root_dir)
+            self.word_db = open_word_database(root_dir)
+            self.generation = index_generation(self.conn)
+            # Pas bij het eerste 'varianten'-verzoek geladen.
+            self.fuzzy_index = None
+            self.last_scan = time.monotonic()
+            super().__init__(socket_path, Handler)
+
+        def service_actions(self):
+            if time.monotonic() - self.last_scan >= watch_interval:
+                self.refresh()
+
+        def refresh(self):
+            update_index(self.conn, find_transcripts(root_dir))
+            self.last_scan = time.monotonic()
+            generation = index_generation(self.conn)
+            if generation != self.generation:
+                self.word_db.close()
+                self.word_db = open_word_database(root_dir)
+                self.fuzzy_index = None
+                self.generation = generation
+                logging.info(f"Query-server: index bijgewerkt naar generatie {generation}.")
+
+        def dispatch(self, request):
+            op = request.get('op')
+            if request.get('root_dir', root) != root:
+                raise ValueError(f"deze server bedient {root}, niet {request.get('root_dir')}")
+            if op == 'ping':
+                return {'root_dir': root, 'generation': self.generation, 'pid': os.getpid()}
+            if op == 'zoek':
+                return search_phrases(self.conn, request['terms'])
+            if op == 'kut':
+                return search_precise_clips(self.conn, request['terms'])
+            if op == 'woorden':
+                words = request['words']
+                counts = {word: self.word_db.count(word) for word in words if word in self.word_db}
+                maximum = (max_sentences(self.word_db, words, request.get('min_length'), request.get('max_length'))
+                           if len(counts) == len(set(words)) else 0)
+                return {'counts': counts, 'max_sentences': maximum}
+            if op == 'plan':
+                return plan_sentences(self.word_db, request['words'], request['n'],
+                                      request.get('min_length'), request.get('max_length'))
+            if op == 'varianten':
+                if self.fuzzy_index is None:
+                    self.fuzzy_index = open_fuzzy_index(self.word_db)
+                return {word: self.fuzzy_index.similar(word, limit=request['limit']) for word in request['words']}
+            raise ValueError(f"onbekende operatie '{op}'")
+
+    if os.path.exists(socket_path):
+        if _socket_alive(socket_path):
+            console.print(f"[red]Er draait al een server op {socket_path}.[/red]")
+            return
+        # Restant van een server die niet netjes is gestopt.
+        os.remove(socket_path)
+
+    server = QueryServer()
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    console.print(f"--> [bold green]✓ Query-server luistert op {socket_path}[/bold green] voor '{root_dir}' "
+                  f"(nieuwe transcripties worden elke {watch_interval:.0f}s opgepikt). Stoppen met Ctrl+C.")
+    logging.info(f"Query-server gestart op {socket_path} voor {root}.")
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        console.print("\n-> Query-server gestopt.")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server.word_db.close()
+        server.conn.close()
+        logging.info("Query-server gestopt.")
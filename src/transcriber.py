@@ -1,70 +1,82 @@
 # src/transcriber.py
 import subprocess
 import os
+import json
 import sys
+import queue
+import collections
 import shutil
 import logging 
-from rich.console import Console
+import time
+import threading
+from console import console
 from subprocess import Popen, PIPE
 from rich.live import Live
+from rich.progress import Progress, TextColumn, BarColumn
+from whisper_engine import WhisperXEngine, AlignEngine, write_transcript, decode_audio
+from separator import separate_vocals
+from indexer import find_transcripts
+from transcript import read_transcript, video_path_for
+import metrics
 
-console = Console(force_terminal=True)
+def _threads_per_job(jobs):
+    """Verdeelt de CPU-cores over het aantal gelijktijdige WhisperX-processen."""
+    return max(1, (os.cpu_count() or 4) // jobs)
 
-def _run_transcription_on_file(video_file, prompt, mode):
-    """
-    Voert het transcriptieproces uit op een enkel videobestand volgens de gekozen modus.
-    """
+def _extract_audio(video_file):
+    """Extraheert 16 kHz mono PCM audio naast de video en geeft het .wav pad terug."""
     dirname = os.path.dirname(video_file)
     filename_no_ext = os.path.splitext(os.path.basename(video_file))[0]
-    
     temp_wav_file = os.path.join(dirname, f"{filename_no_ext}.wav")
-    target_audio_for_whisperx = temp_wav_file
-    cleanup_paths = [temp_wav_file]
-
-    console.print(f"-> Start verwerking van: [yellow]{os.path.basename(video_file)}[/yellow]")    
-    console.print(f"[1/{'3' if mode == 'demucs' else '2'}] Audio extraheren met ffmpeg...")
     ffmpeg_command = [
         'ffmpeg', '-i', video_file, '-vn', '-ar', '16000', '-ac', '1',
         '-c:a', 'pcm_s16le', temp_wav_file, '-y', '-hide_banner', '-loglevel', 'error'
     ]
-    subprocess.run(ffmpeg_command, check=True)
+    try:
+        subprocess.run(ffmpeg_command, check=True)
+    except BaseException:
+        _cleanup([temp_wav_file])
+        raise
+    return temp_wav_file
 
-    if mode == 'demucs':
-        console.print("-> Hernoemen van demucs-output naar correct formaat...")
-        source_json_path = os.path.join(dirname, "vocals.json")
-        target_json_path = os.path.join(dirname, f"{filename_no_ext}.json")
-        if os.path.exists(source_json_path):
-            os.rename(source_json_path, target_json_path)
-            logging.info(f"Hernoemd: {source_json_path} -> {target_json_path}")
-        else:
-            console.print(f"[yellow]Waarschuwing: geen {source_json_path} dus ekkes transcriberen.[/yellow]")
-            logging.warning(f"{source_json_path} niet gevonden om te hernoemen na demucs-transcriptie.")
+def _prepare_audio(video_file, mode, engine):
+    """
+    Met een in-proces engine decodeert ffmpeg direct naar een buffer in het geheugen;
+    voor de whisperx CLI is een tijdelijk .wav bestand nodig. In demucs-modus is de
+    bron de (gecachte) zang-stem, die nooit opgeruimd wordt.
+    Geeft (audio, op te ruimen paden) terug.
+    """
+    with metrics.span('audio extraheren', mode=mode, video=os.path.basename(video_file)):
+        if mode == 'demucs':
+            stem_path = separate_vocals(video_file)
+            return (decode_audio(stem_path) if engine is not None else stem_path), []
+        if engine is not None:
+            return decode_audio(video_file), []
+        temp_wav_file = _extract_audio(video_file)
+        return temp_wav_file, [temp_wav_file]
 
-    step_num = "3/3" if mode == 'demucs' else "2/2"
-    console.print(f"[{step_num}] Transcriberen met WhisperX...Dit duurt wat langer maar valt mee 😉")
+def _move_whisperx_output(audio_file, video_file):
+    """WhisperX noemt de JSON naar het audiobestand; zet hem naast de video onder de juiste naam."""
+    produced = os.path.join(os.path.dirname(video_file),
+                            os.path.splitext(os.path.basename(audio_file))[0] + '.json')
+    target = os.path.splitext(video_file)[0] + '.json'
+    if produced != target:
+        os.replace(produced, target)
+        logging.info(f"Hernoemd: {produced} -> {target}")
+
+def _start_whisperx(audio_file, output_dir, prompt, threads):
+    """Start WhisperX als subprocess; stdout wordt regel voor regel doorgegeven."""
     whisperx_command = [
-        'whisperx', target_audio_for_whisperx, '--model', 'medium', '--language', 'nl',
+        'whisperx', audio_file, '--model', 'medium', '--language', 'nl',
         '--output_format', 'json', '--align_model', 'jonatasgrosman/wav2vec2-large-xlsr-53-dutch',
-        '--output_dir', dirname, '--threads', '4'
+        '--output_dir', output_dir, '--threads', str(threads)
     ]
     if prompt:
-        console.print(f"      |--> Hints: '{prompt}'")
         whisperx_command.extend(['--initial_prompt', prompt])
+    return Popen(whisperx_command, stdout=PIPE, stderr=PIPE, text=True, encoding='utf-8', bufsize=1)
 
-    process = Popen(whisperx_command, stdout=PIPE, stderr=PIPE, text=True, encoding='utf-8', bufsize=1)
-    with Live(console=console, auto_refresh=True, vertical_overflow="crop") as live:
-        live.update("[cyan]WhisperX gestart, er kan nog output komen, maar laat dit gerust even runnen[/cyan]")
-        for line in iter(process.stdout.readline, ""):
-            if line.strip():
-                live.update(f"[green]{line.strip().replace("Transcript: ","")}[/green]")
-    process.wait()
-    if process.returncode != 0:
-        stderr_output = process.stderr.read()
-        console.print("[bold red]Fout tijdens uitvoeren van WhisperX.[/bold red]")
-        console.print(f"[red]{stderr_output}[/red]")
-        return 
-    console.print("-> Opruimen van tijdelijke bestanden...")
-    for path in cleanup_paths:
+def _cleanup(paths):
+    for path in paths:
         try:
             if os.path.isfile(path):
                 os.remove(path)
@@ -72,16 +84,208 @@ def _run_transcription_on_file(video_file, prompt, mode):
                 shutil.rmtree(path)
         except OSError as e:
             console.print(f"[red]Fout bij opruimen van {path}: {e}[/red]")
-    console.print(f"-> [green]Verwerking van {os.path.basename(video_file)} is klaar.[/green]")
 
-def transcribe_path(target_path, prompt, mode):
+def _transcribe_in_process(engine, audio, video_file):
+    """Transcribeert een audiobuffer met de al geladen modellen en schrijft de JSON naast de video."""
+    start = time.perf_counter()
+    with metrics.span('whisperx', engine='inproces', video=os.path.basename(video_file)):
+        result = engine.transcribe(audio)
+    write_transcript(result, os.path.splitext(video_file)[0] + '.json')
+    return time.perf_counter() - start
+
+def _run_transcription_on_file(video_file, prompt, mode, threads=None, engine=None):
+    """
+    Voert het transcriptieproces uit op een enkel videobestand volgens de gekozen modus.
+    Met een `engine` wordt in-proces getranscribeerd in plaats van via de whisperx CLI.
+    """
+    dirname = os.path.dirname(video_file)
+
+    console.print(f"-> Start verwerking van: [yellow]{os.path.basename(video_file)}[/yellow]")    
+    if mode == 'demucs':
+        console.print("[1/2] Zang scheiden met demucs (of gecachte stem gebruiken)...")
+    elif engine is not None:
+        console.print("[1/2] Audio decoderen met ffmpeg (in het geheugen)...")
+    else:
+        console.print("[1/2] Audio extraheren met ffmpeg...")
+    audio, cleanup_paths = _prepare_audio(video_file, mode, engine)
+    try:
+        console.print(f"[2/2] Transcriberen met WhisperX...Dit duurt wat langer maar valt mee 😉")
+        if prompt:
+            console.print(f"      |--> Hints: '{prompt}'")
+
+        if engine is not None:
+            with console.status("[cyan]WhisperX (in-proces) is bezig...[/cyan]"):
+                seconds = _transcribe_in_process(engine, audio, video_file)
+            console.print(f"      |--> Getranscribeerd in [cyan]{seconds:.1f}s[/cyan]")
+            logging.info(f"Getranscribeerd in {seconds:.1f}s: {os.path.basename(video_file)}")
+            console.print(f"-> [green]Verwerking van {os.path.basename(video_file)} is klaar.[/green]")
+            return seconds
+
+        with metrics.span('whisperx', engine='cli', video=os.path.basename(video_file)):
+            process = _start_whisperx(audio, dirname, prompt, threads or _threads_per_job(1))
+            with Live(console=console, auto_refresh=True, vertical_overflow="crop") as live:
+                live.update("[cyan]WhisperX gestart, er kan nog output komen, maar laat dit gerust even runnen[/cyan]")
+                for line in iter(process.stdout.readline, ""):
+                    if line.strip():
+                        live.update(f"[green]{line.strip().replace("Transcript: ","")}[/green]")
+            process.wait()
+        if process.returncode != 0:
+            stderr_output = process.stderr.read()
+            console.print("[bold red]Fout tijdens uitvoeren van WhisperX.[/bold red]")
+            console.print(f"[red]{stderr_output}[/red]")
+            return 
+        _move_whisperx_output(audio, video_file)
+        console.print(f"-> [green]Verwerking van {os.path.basename(video_file)} is klaar.[/green]")
+    finally:
+        # Ook bij een fout mag er geen .wav achterblijven.
+        if cleanup_paths:
+            console.print("-> Opruimen van tijdelijke bestanden...")
+            _cleanup(cleanup_paths)
+
+def transcribe_audio(audio, video_file, prompt, threads, engine=None, on_status=None):
+    """
+    Transcribeert voorbereide audio (zie `_prepare_audio`) en zet de JSON naast de video.
+    Zonder live weergave: voortgang gaat naar `on_status`, een fout wordt een exception.
+    Geeft de duur terug bij een in-proces engine, anders None.
+    """
+    name = os.path.basename(video_file)
+    on_status = on_status or (lambda status: None)
+    if engine is not None:
+        on_status("WhisperX (in-proces) is bezig...")
+        seconds = _transcribe_in_process(engine, audio, video_file)
+        logging.info(f"Getranscribeerd in {seconds:.1f}s: {name}")
+        return seconds
+    on_status("WhisperX gestart")
+    with metrics.span('whisperx', engine='cli', video=name):
+        process = _start_whisperx(audio, os.path.dirname(video_file), prompt, threads)
+        # stderr apart leegtrekken, anders kan WhisperX vastlopen op een volle pipe.
+        stderr_tail = collections.deque(maxlen=5)
+        stderr_reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+        stderr_reader.start()
+        for line in iter(process.stdout.readline, ""):
+            if line.strip():
+                on_status(line.strip().replace('Transcript: ', '')[:80])
+        process.wait()
+        stderr_reader.join()
+    if process.returncode != 0:
+        raise RuntimeError(" ".join(l.strip() for l in stderr_tail) or "WhisperX faalde")
+    _move_whisperx_output(audio, video_file)
+    logging.info(f"Getranscribeerd: {name}")
+    return None
+
+def transcribe_file(video_file, prompt, mode, jobs=1, engine=None, on_status=None):
+    """
+    Eén video van begin tot eind zonder live weergave: audio voorbereiden, transcriberen
+    en opruimen. Bedoeld voor aanroepers met hun eigen weergave, zoals `ingest`.
+    """
+    audio, cleanup_paths = _prepare_audio(video_file, mode, engine)
+    try:
+        return transcribe_audio(audio, video_file, prompt, _threads_per_job(jobs), engine, on_status)
+    finally:
+        _cleanup(cleanup_paths)
+
+def _transcribe_parallel(files_to_process, prompt, mode, jobs, engine=None):
+    """
+    Transcribeert met `jobs` gelijktijdige WhisperX-processen. Een aparte thread
+    extraheert alvast de audio van de volgende video's, zodat ffmpeg en WhisperX overlappen.
+    De wachtrij is begrensd, dus er staan nooit meer dan `jobs` WAV's (of audiobuffers) klaar.
+    Met een in-proces `engine` is er één worker, want er is maar één set modellen geladen.
+    """
+    if engine is not None:
+        jobs = 1
+    threads = _threads_per_job(jobs)
+    console.print(f"-> [cyan]{jobs}[/cyan] gelijktijdige worker(s), elk met [cyan]{threads}[/cyan] thread(s).")
+    if prompt:
+        console.print(f"      |--> Hints: '{prompt}'")
+
+    audio_queue = queue.Queue(maxsize=jobs)
+    done = object()
+
+    progress = Progress(
+        TextColumn("{task.description}"),
+        BarColumn(bar_width=20),
+        TextColumn("{task.fields[status]}"),
+        console=console,
+    )
+    overall = progress.add_task("[bold]Totaal[/bold]", total=len(files_to_process),
+                                status=f"0/{len(files_to_process)}")
+
+    def finish(task, message):
+        # Klaar-regels komen boven de live weergave, zodat alleen actieve bestanden een rij houden.
+        progress.remove_task(task)
+        progress.console.print(message)
+        progress.advance(overall)
+        progress.update(overall, status=f"{int(progress.tasks[0].completed)}/{len(files_to_process)}")
+
+    def extractor():
+        for video_file in files_to_process:
+            name = os.path.basename(video_file)
+            status = "zang scheiden..." if mode == 'demucs' else "audio extraheren..."
+            task = progress.add_task(f"[yellow]{name}[/yellow]", total=None, status=f"[cyan]{status}[/cyan]")
+            try:
+                audio, cleanup_paths = _prepare_audio(video_file, mode, engine)
+            except Exception as e:
+                logging.error(f"Fout bij audio extraheren van {name}: {e}")
+                finish(task, f"[bold red]✗ {name}: ffmpeg fout: {e}[/bold red]")
+                continue
+            progress.update(task, status="[cyan]wacht op worker...[/cyan]")
+            audio_queue.put((video_file, audio, cleanup_paths, task))
+        for _ in range(jobs):
+            audio_queue.put(done)
+
+    def worker():
+        while True:
+            item = audio_queue.get()
+            if item is done:
+                return
+            video_file, audio, cleanup_paths, task = item
+            name = os.path.basename(video_file)
+            try:
+                seconds = transcribe_audio(audio, video_file, prompt, threads, engine,
+                                           on_status=lambda status: progress.update(task, status=f"[green]{status}[/green]"))
+                finish(task, f"[green]✓ {name}" + (f" ({seconds:.1f}s)" if seconds is not None else "") + "[/green]")
+            except Exception as e:
+                logging.error(f"Fout bij verwerken van {name}: {e}")
+                finish(task, f"[bold red]✗ {name}: {e}[/bold red]")
+            finally:
+                _cleanup(cleanup_paths)
+
+    with progress:
+        threads_list = [threading.Thread(target=extractor, daemon=True)]
+        threads_list += [threading.Thread(target=worker, daemon=True) for _ in range(jobs)]
+        for thread in threads_list:
+            thread.start()
+        for thread in threads_list:
+            thread.join()
+
+def load_engine(prompt):
+    """Laadt de in-proces modellen één keer en meldt hoe lang dat duurde."""
+    with console.status("[cyan]WhisperX modellen laden...[/cyan]"):
+        engine = WhisperXEngine(prompt=prompt, threads=_threads_per_job(1))
+    console.print(f"-> Modellen geladen op [cyan]{engine.device}[/cyan] in [cyan]{engine.load_seconds:.1f}s[/cyan]")
+    return engine
+
+def transcribe_path(target_path, prompt, mode, jobs=1, engine='cli'):
     """
     Transcribeert een enkel videobestand of alle nieuwe video's in een map.
+    Met jobs > 1 worden meerdere video's tegelijk verwerkt. Met engine='inproces'
+    blijven de WhisperX modellen de hele run geladen.
     """
-    if os.path.isfile(target_path) and target_path.endswith('.mp4'):
+    is_video = os.path.isfile(target_path) and target_path.endswith('.mp4')
+    if engine == 'inproces' and (is_video or os.path.isdir(target_path)):
+        try:
+            engine = load_engine(prompt)
+        except Exception as e:
+            console.print(f"[bold red]Kan de in-proces engine niet laden: {e}[/bold red]")
+            logging.error(f"Kan de in-proces engine niet laden: {e}")
+            return
+    else:
+        engine = None
+
+    if is_video:
         console.print("--- Transcriptie gestart (enkel bestand) ---")
         try:
-            _run_transcription_on_file(target_path, prompt, mode)
+            _run_transcription_on_file(target_path, prompt, mode, engine=engine)
         except Exception as e:
             console.print(f"[bold red]Er is een onverwachte fout opgetreden: {e}[/bold red]")
         console.print("--- Transcriptie klaar ---")
@@ -104,17 +308,145 @@ def transcribe_path(target_path, prompt, mode):
                 logging.info(f"Overgeslagen: {skipped_file}")
         if not files_to_process:
             console.print("-> [green]Geen nieuwe video's gevonden om te transcriberen.[/green]")
+        elif jobs > 1:
+            console.print(f"-> [bold green]{len(files_to_process)}[/bold green] nieuwe video('s) gevonden. Starten...")
+            _transcribe_parallel(files_to_process, prompt, mode, jobs, engine)
         else:
             console.print(f"-> [bold green]{len(files_to_process)}[/bold green] nieuwe video('s) gevonden. Starten...")
+            file_seconds = []
             for i, video_file in enumerate(files_to_process, 1):
                 console.print(f"\n--- Video {i}/{len(files_to_process)} ---")
                 try:
-                    _run_transcription_on_file(video_file, prompt, mode)
+                    seconds = _run_transcription_on_file(video_file, prompt, mode, engine=engine)
+                    if seconds is not None:
+                        file_seconds.append(seconds)
                 except Exception as e:
                     console.print(f"[bold red]Fout bij verwerken van {os.path.basename(video_file)}: {e}[/bold red]")
                     logging.error(f"Fout bij verwerken van {os.path.basename(video_file)}: {e}")
                     console.print("[yellow]Doorgaan met de volgende video...[/yellow]")
                     continue
+            if engine is not None and file_seconds:
+                console.print(f"-> Modellen laden: [cyan]{engine.load_seconds:.1f}s[/cyan] (eenmalig), "
+                              f"transcriberen: [cyan]{sum(file_seconds):.1f}s[/cyan] voor {len(file_seconds)} video('s), "
+                              f"gemiddeld [cyan]{sum(file_seconds) / len(file_seconds):.1f}s[/cyan] per video.")
         console.print("\n--- Batch transcriptie klaar ---")
     else:
         console.print(f"[red]Fout: '{target_path}' is geen geldig .mp4-bestand of map.[/red]", file=sys.stderr)
+
+def _unaligned_segments(transcript):
+    """Indices van segmenten met tekst en tijden, maar zonder één woord met tijden."""
+    timed = {seg_id for seg_id, start, end in zip(transcript.seg_ids, transcript.starts, transcript.ends)
+             if start is not None and end is not None}
+    return [seg_id for seg_id, (start, end, text) in enumerate(transcript.segments)
+            if text and start is not None and end is not None and seg_id not in timed]
+
+def find_unaligned(root_dir):
+    """
+    Alle transcripties onder root_dir met een video en segmenten zonder tijden per woord:
+    ondertitel-afleveringen en JSON's waar de alignment mislukt is. Geeft per transcriptie
+    (pad, video, Transcript, segment-indices).
+    """
+    found = []
+    for path in find_transcripts(root_dir):
+        video_path = video_path_for(path)
+        if not os.path.exists(video_path): continue
+        transcript = read_transcript(path)
+        if transcript is None: continue
+        seg_ids = _unaligned_segments(transcript)
+        if seg_ids:
+            found.append((path, video_path, transcript, seg_ids))
+    return found
+
+def _source_segments(path, transcript):
+    """
+    De segmenten zoals ze in de WhisperX JSON staan, zodat scores en al gealignde woorden
+    bewaard blijven. Komt de transcriptie uit een ondertitel (of is de JSON onbruikbaar),
+    dan worden ze opgebouwd uit de Transcript.
+    """
+    json_path = os.path.splitext(path)[0] + '.json'
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            segments = json.load(f).get('segments')
+        if isinstance(segments, list) and len(segments) == len(transcript.segments):
+            return segments
+    except (OSError, ValueError, AttributeError):
+        pass
+    return [{'start': start, 'end': end, 'text': text} for start, end, text in transcript.segments]
+
+def _align_file(engine, path, transcript, seg_ids, audio):
+    """
+    Aligned de segmenten `seg_ids` van één transcriptie en schrijft het resultaat als WhisperX
+    JSON naast de video. De overige segmenten blijven zoals ze waren. Geeft het aantal woorden
+    dat tijden kreeg.
+    """
+    segments = _source_segments(path, transcript)
+    todo = set(seg_ids)
+    to_align = [{'start': segments[i]['start'], 'end': segments[i]['end'], 'text': segments[i]['text']}
+                for i in seg_ids]
+    aligned = engine.align(to_align, audio)
+    # WhisperX kan segmenten in zinnen opsplitsen, dus op tijd terug in de volgorde zetten.
+    merged = sorted([segment for i, segment in enumerate(segments) if i not in todo] + aligned,
+                    key=lambda segment: segment['start'])
+    write_transcript({
+        'segments': merged,
+        'word_segments': [word for segment in merged for word in segment.get('words', [])],
+        'language': engine.language,
+    }, os.path.splitext(path)[0] + '.json')
+    return sum(1 for segment in aligned for word in segment.get('words', []) if 'start' in word)
+
+def align_path(root_dir):
+    """
+    Geeft transcripties zonder tijden per woord alsnog woordtijden, met alleen de wav2vec2
+    forced-alignment stap van WhisperX over de bestaande segmenttekst. Het model wordt één
+    keer geladen; een aparte thread decodeert alvast de audio van de volgende video.
+    """
+    work = find_unaligned(root_dir)
+    if not work:
+        console.print("-> [green]Alle transcripties hebben al tijden per woord.[/green]")
+        return
+    console.print(f"-> [bold green]{len(work)}[/bold green] transcriptie(s) met "
+                  f"[cyan]{sum(len(seg_ids) for *_, seg_ids in work)}[/cyan] segment(en) zonder woordtijden.")
+    try:
+        with console.status("[cyan]Alignment-model laden...[/cyan]"):
+            engine = AlignEngine()
+    except Exception as e:
+        console.print(f"[bold red]Kan het alignment-model niet laden: {e}[/bold red]")
+        logging.error(f"Kan het alignment-model niet laden: {e}")
+        return
+    console.print(f"-> Model geladen op [cyan]{engine.device}[/cyan] in [cyan]{engine.load_seconds:.1f}s[/cyan]")
+
+    # Begrensd: er staat hoogstens één gedecodeerde video klaar naast de video die gealigned wordt.
+    audio_queue = queue.Queue(maxsize=1)
+    def decoder():
+        for path, video_path, transcript, seg_ids in work:
+            try:
+                with metrics.span('audio extraheren', mode='align', video=os.path.basename(video_path)):
+                    audio = decode_audio(video_path)
+            except Exception as e:
+                audio = e
+            audio_queue.put((path, video_path, transcript, seg_ids, audio))
+        audio_queue.put(None)
+    threading.Thread(target=decoder, daemon=True).start()
+
+    start = time.perf_counter()
+    files, words = 0, 0
+    with Progress(*Progress.get_default_columns(), console=console) as progress:
+        task = progress.add_task("[green]Alignen...", total=len(work))
+        while (item := audio_queue.get()) is not None:
+            path, video_path, transcript, seg_ids, audio = item
+            name = os.path.basename(video_path)
+            try:
+                if isinstance(audio, Exception):
+                    raise RuntimeError(f"ffmpeg fout: {audio}")
+                with metrics.span('alignen', video=name, segments=len(seg_ids)):
+                    aligned_words = _align_file(engine, path, transcript, seg_ids, audio)
+                files += 1
+                words += aligned_words
+                progress.console.print(f"[green]✓ {name}: {aligned_words} woorden in {len(seg_ids)} segment(en)[/green]")
+                logging.info(f"Gealigned: {name} ({aligned_words} woorden in {len(seg_ids)} segmenten)")
+            except Exception as e:
+                logging.error(f"Fout bij alignen van {name}: {e}")
+                progress.console.print(f"[bold red]✗ {name}: {e}[/bold red]")
+            progress.advance(task)
+    console.print(f"--> [bold green]✓ {files} transcriptie(s) gealigned, {words} woorden met tijden erbij "
+                  f"in {time.perf_counter() - start:.1f}s (plus {engine.load_seconds:.1f}s model laden).[/bold green]")
@@ -0,0 +1,214 @@
+# src/transcript.py
+import os
+import re
+import json
+import marshal
+import logging
+import metrics
+
+# Geen .json, .tsv, .vtt of .srt: alles met zo'n extensie wordt als transcriptie gezien.
+SIDECAR_SUFFIX = '.woorden'
+SIDECAR_VERSION = 1
+# Transcriptie-formaten in volgorde van voorkeur; WhisperX schrijft ze allemaal naast de video.
+# Alleen de JSON heeft tijden per woord, de rest alleen per segment. De .txt heeft geen tijden.
+TRANSCRIPT_SUFFIXES = ('.json', '.tsv', '.vtt', '.srt')
+
+def normalize_word(word):
+    """Normaliseert een woord zoals alle zoekmethodes het vergelijken."""
+    return word.strip(".,!?").lower()
+
+class Transcript:
+    """
+    Een transcriptie zoals de zoekfuncties hem nodig hebben: de segmenten als
+    (start, end, tekst) en alle woorden als één platte lijst, met de genormaliseerde
+    vorm al één keer uitgerekend. Woorden zonder tijden staan er met None in, zodat
+    posities overeenkomen met de index.
+    """
+    __slots__ = ('segments', 'words', 'starts', 'ends', 'seg_ids')
+
+    def __init__(self, segments, words, starts, ends, seg_ids):
+        self.segments = segments
+        self.words = words
+        self.starts = starts
+        self.ends = ends
+        self.seg_ids = seg_ids
+
+    @classmethod
+    def from_whisperx(cls, data):
+        segments, words, starts, ends, seg_ids = [], [], [], [], []
+        for seg_id, segment in enumerate(data.get('segments', [])):
+            segments.append((segment.get('start'), segment.get('end'), segment.get('text', '').strip()))
+            for word_info in segment.get('words', []):
+                words.append(normalize_word(word_info.get('word', '')))
+                starts.append(word_info.get('start'))
+                ends.append(word_info.get('end'))
+                seg_ids.append(seg_id)
+        return cls(segments, words, starts, ends, seg_ids)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Uit ondertitels met alleen tijden per segment. De woorden krijgen geen tijden, zodat
+        zoeken op hele segmenten werkt en woord-voor-woord zoeken ze netjes overslaat.
+        """
+        words, seg_ids = [], []
+        for seg_id, (_, _, text) in enumerate(segments):
+            for word in text.split():
+                words.append(normalize_word(word))
+                seg_ids.append(seg_id)
+        return cls(segments, words, [None] * len(words), [None] * len(words), seg_ids)
+
+    def match_phrases(self, phrases, same_segment=False):
+        """
+        Alle plekken waar een van de zinnen (lijsten genormaliseerde woorden) begint, in één
+        lineaire doorloop: per positie worden alleen de zinnen vergeleken die met dat woord
+        beginnen. Geeft (positie, index in phrases) in volgorde van positie.
+        """
+        by_first = {}
+        for phrase_idx, phrase in enumerate(phrases):
+            if phrase:
+                by_first.setdefault(phrase[0], []).append((phrase_idx, phrase))
+        words, seg_ids = self.words, self.seg_ids
+        for i, word in enumerate(words):
+            candidates = by_first.get(word)
+            if candidates is None:
+                continue
+            for phrase_idx, phrase in candidates:
+                end = i + len(phrase)
+                if end > len(words) or words[i:end] != phrase:
+                    continue
+                if same_segment and seg_ids[end - 1] != seg_ids[i]:
+                    continue
+                yield i, phrase_idx
+
+def sidecar_path(json_path):
+    return os.path.splitext(json_path)[0] + SIDECAR_SUFFIX
+
+def video_path_for(transcript_path):
+    """De .mp4 die bij een transcriptie hoort, in welk formaat die ook is."""
+    return os.path.splitext(transcript_path)[0] + '.mp4'
+
+def _read_whisperx(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        try: data = json.load(f)
+        except json.JSONDecodeError: return None
+    if not isinstance(data, dict): return None
+    return Transcript.from_whisperx(data)
+
+def _read_tsv(path):
+    """WhisperX .tsv: een kopregel `start, end, text` en dan per segment de tijden in milliseconden."""
+    segments = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t', 2)
+            if len(fields) != 3: continue
+            try: start, end = int(fields[0]) / 1000, int(fields[1]) / 1000
+            except ValueError: continue
+            segments.append((start, end, fields[2].strip()))
+    return Transcript.from_segments(segments)
+
+_CUE_TIMING = re.compile(r'^\s*((?:\d+:)?\d+:\d+[.,]\d+)\s*-->\s*((?:\d+:)?\d+:\d+[.,]\d+)')
+
+def _timestamp(text):
+    seconds = 0.0
+    for part in text.replace(',', '.').split(':'):
+        seconds = seconds * 60 + float(part)
+    return round(seconds, 3)
+
+def _read_cues(path):
+    """WebVTT en SRT: blokken met een regel `begin --> eind` en daaronder de tekst tot een lege regel."""
+    segments, cue, text = [], None, []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            timing = _CUE_TIMING.match(line)
+            if timing:
+                cue, text = (_timestamp(timing.group(1)), _timestamp(timing.group(2))), []
+            elif not line:
+                if cue and text:
+                    segments.append((*cue, ' '.join(text)))
+                cue = None
+            elif cue:
+                text.append(line)
+    if cue and text:
+        segments.append((*cue, ' '.join(text)))
+    return Transcript.from_segments(segments)
+
+# Per extensie de functie die er een Transcript van maakt, of None als het bestand niks bruikbaars bevat.
+READERS = {'.json': _read_whisperx, '.tsv': _read_tsv, '.vtt': _read_cues, '.srt': _read_cues}
+
+def _parse(path):
+    """
+    Leest een transcriptie met de reader voor zijn extensie. Levert dat niks op (een lege of
+    kapotte JSON), dan worden de andere formaten naast hetzelfde bestand geprobeerd.
+    """
+    base, suffix = os.path.splitext(path)
+    for candidate in (suffix, *(other for other in TRANSCRIPT_SUFFIXES if other != suffix)):
+        candidate_path = base + candidate
+        if candidate_path != path and not os.path.exists(candidate_path): continue
+        try:
+            transcript = READERS[candidate](candidate_path)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Kon {candidate_path} niet lezen: {e}")
+            continue
+        if transcript is not None and transcript.segments:
+            return transcript
+    return None
+
+def find_transcript_files(root_dir):
+    """
+    Eén transcriptie per aflevering onder root_dir, in os.walk volgorde: de JSON als die er is
+    en niet leeg is, en anders de eerste ondertitel uit TRANSCRIPT_SUFFIXES.
+    """
+    found = []
+    for subdir, _, files in os.walk(root_dir):
+        by_base = {}
+        for file in files:
+            base, suffix = os.path.splitext(file)
+            if suffix in READERS:
+                by_base.setdefault(base, {})[suffix] = file
+        for base, present in by_base.items():
+            paths = [os.path.join(subdir, present[suffix]) for suffix in TRANSCRIPT_SUFFIXES if suffix in present]
+            found.append(next((path for path in paths if os.path.getsize(path) > 0), paths[0]))
+    return found
+
+def _read_sidecar(path, stat):
+    try:
+        with open(path, 'rb') as f:
+            version, mtime, size, fields = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (version, mtime, size) != (SIDECAR_VERSION, stat.st_mtime, stat.st_size):
+        return None
+    return Transcript(*fields)
+
+def _write_sidecar(path, stat, transcript):
+    fields = [getattr(transcript, name) for name in Transcript.__slots__]
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(marshal.dumps((SIDECAR_VERSION, stat.st_mtime, stat.st_size, fields)))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Kon {path} niet schrijven: {e}")
+
+def read_transcript(json_path, cache=True):
+    """
+    Leest een transcriptie (WhisperX JSON, of .tsv/.vtt/.srt) als Transcript, of None als er
+    niks bruikbaars in staat. Met `cache` komt hij uit een `.woorden` sidecar naast de JSON
+    (marshal, geldig zolang mtime en grootte van de JSON gelijk zijn); die is een stuk sneller
+    te laden dan de volledige JSON met alle scores en de dubbele `word_segments`.
+    """
+    stat = os.stat(json_path)
+    path = sidecar_path(json_path)
+    if cache:
+        with metrics.span('sidecar lezen', aggregate=True):
+            transcript = _read_sidecar(path, stat)
+        if transcript is not None:
+            return transcript
+    with metrics.span('transcriptie parsen', aggregate=True):
+        transcript = _parse(json_path)
+    if transcript is None: return None
+    if cache:
+        _write_sidecar(path, stat, transcript)
+    return transcript
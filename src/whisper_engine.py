@@ -0,0 +1,105 @@
+# src/whisper_engine.py
+import os
+import json
+import time
+import logging
+import subprocess
+
+WHISPER_MODEL = 'medium'
+LANGUAGE = 'nl'
+ALIGN_MODEL = 'jonatasgrosman/wav2vec2-large-xlsr-53-dutch'
+SAMPLE_RATE = 16000
+
+def decode_audio(media_file, sample_rate=SAMPLE_RATE):
+    """
+    Decodeert de audio van een video via een ffmpeg-pipe naar een mono float32 buffer,
+    zonder tussenbestand op schijf.
+    """
+    import numpy as np
+    ffmpeg_command = [
+        'ffmpeg', '-nostdin', '-i', media_file, '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 's16le', '-c:a', 'pcm_s16le', '-hide_banner', '-loglevel', 'error', '-'
+    ]
+    pcm = subprocess.run(ffmpeg_command, capture_output=True, check=True).stdout
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+class WhisperXEngine:
+    """
+    Houdt het Whisper-model en het wav2vec2 alignment-model in het geheugen,
+    zodat ze per batch maar één keer geladen worden in plaats van per video.
+    Levert dezelfde JSON-layout als de `whisperx` CLI met `--output_format json`.
+    """
+
+    def __init__(self, prompt=None, threads=4, model=WHISPER_MODEL, language=LANGUAGE, align_model=ALIGN_MODEL):
+        try:
+            import torch
+            import whisperx
+        except ImportError as e:
+            raise RuntimeError(f"De in-proces engine heeft whisperx en torch nodig ({e}). Draai ./setup.sh opnieuw.") from e
+        self._whisperx = whisperx
+        self.language = language
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        compute_type = 'float16' if self.device == 'cuda' else 'int8'
+
+        start = time.perf_counter()
+        asr_options = {'initial_prompt': prompt} if prompt else None
+        self.model = whisperx.load_model(model, self.device, compute_type=compute_type, language=language,
+                                         asr_options=asr_options, threads=threads)
+        self.align_model, self.align_metadata = whisperx.load_align_model(
+            language_code=language, device=self.device, model_name=align_model)
+        self.load_seconds = time.perf_counter() - start
+        logging.info(f"WhisperX modellen geladen op {self.device} in {self.load_seconds:.1f}s")
+
+    def transcribe(self, audio, batch_size=8):
+        """Transcribeert en aligned een 16 kHz mono float32 audiobuffer."""
+        result = self.model.transcribe(audio, batch_size=batch_size, language=self.language)
+        aligned = self._whisperx.align(result['segments'], self.align_model, self.align_metadata,
+                                       audio, self.device, return_char_alignments=False)
+        return {
+            'segments': aligned['segments'],
+            'word_segments': aligned.get('word_segments', []),
+            'language': self.language,
+        }
+
+    def transcribe_file(self, audio_file, batch_size=8):
+        return self.transcribe(self._whisperx.load_audio(audio_file), batch_size=batch_size)
+
+class AlignEngine:
+    """
+    Alleen het wav2vec2 alignment-model van WhisperX, voor transcripties die al tekst per
+    segment hebben maar geen tijden per woord. Een stuk lichter dan de hele WhisperXEngine:
+    er wordt niets opnieuw getranscribeerd.
+    """
+
+    def __init__(self, language=LANGUAGE, align_model=ALIGN_MODEL):
+        try:
+            import torch
+            import whisperx
+        except ImportError as e:
+            raise RuntimeError(f"Alignen heeft whisperx en torch nodig ({e}). Draai ./setup.sh opnieuw.") from e
+        self._whisperx = whisperx
+        self.language = language
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        start = time.perf_counter()
+        self.align_model, self.align_metadata = whisperx.load_align_model(
+            language_code=language, device=self.device, model_name=align_model)
+        self.load_seconds = time.perf_counter() - start
+        logging.info(f"Alignment-model geladen op {self.device} in {self.load_seconds:.1f}s")
+
+    def align(self, segments, audio):
+        """
+        Aligned segmenten ({'start', 'end', 'text'}) op een 16 kHz mono float32 audiobuffer.
+        WhisperX kan een segment daarbij in zinnen opsplitsen; de tijden blijven binnen het segment.
+        """
+        aligned = self._whisperx.align(segments, self.align_model, self.align_metadata,
+                                       audio, self.device, return_char_alignments=False)
+        return aligned['segments']
+
+def write_transcript(result, json_path):
+    """Schrijft een resultaat weg zoals de whisperx CLI dat doet (numpy-getallen als float)."""
+    # Via een tijdelijk bestand: een bestaande transcriptie wordt nooit half overschreven.
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, default=float)
+    os.replace(tmp_path, json_path)
@@ -0,0 +1,228 @@
+# src/worddb.py
+import os
+import mmap
+import struct
+import logging
+from array import array
+from console import console
+from indexer import open_index, index_generation, root_file
+import metrics
+
+WORD_DB_FILE = 'word_database.bin'
+
+# Layout (header little-endian, de secties in de byte-volgorde van de machine zoals array en
+# memoryview.cast ze schrijven en lezen; alle secties 4-byte uitgelijnd):
+#   header | path-offsets u32[n_paths+1] | path-blob | word-offsets u32[n_words+1] | word-blob |
+#   posting-offsets u32[n_words+1] | video_id u32[n] | start f32[n] | end f32[n]
+# De woorden staan gesorteerd, zodat een woord met binair zoeken gevonden wordt
+# zonder de rest van de vocabulaire te decoderen.
+MAGIC = b'DKWDB\x00\x01\x00'
+HEADER = struct.Struct('<8sQIII6Q')
+
+def _pad(buf):
+    buf.extend(b'\x00' * (-len(buf) % 4))
+
+def word_db_path(root_dir):
+    """Pad van de woorden-database voor root_dir; hoort bij de index van dezelfde map."""
+    return root_file(WORD_DB_FILE, root_dir)
+
+@metrics.timed('woorden-database schrijven')
+def write_word_database(conn, path):
+    """Schrijft alle woorden met tijden uit de index naar het binaire formaat."""
+    rows = conn.execute(
+        "SELECT p.word, p.video_id, p.start, p.end FROM postings p "
+        "JOIN videos v ON v.id = p.video_id "
+        "WHERE v.has_video = 1 AND p.word != '' AND p.start IS NOT NULL AND p.end IS NOT NULL "
+        "ORDER BY p.word, p.video_id, p.pos"
+    )
+
+    path_index = {}
+    video_paths = dict(conn.execute("SELECT id, video_path FROM videos"))
+    words = []
+    posting_offsets = array('I')
+    video_ids, starts, ends = array('I'), array('f'), array('f')
+    for word, video_id, start, end in rows:
+        if not words or words[-1] != word:
+            words.append(word)
+            posting_offsets.append(len(video_ids))
+        # Videopaden worden ge-interned: per voorkomen staat alleen een index in de padtabel.
+        if video_id not in path_index:
+            path_index[video_id] = len(path_index)
+        video_ids.append(path_index[video_id])
+        starts.append(start)
+        ends.append(end)
+    posting_offsets.append(len(video_ids))
+
+    body = bytearray()
+    def blob_section(strings):
+        offsets, blob = array('I', [0]), bytearray()
+        for string in strings:
+            blob.extend(string.encode('utf-8'))
+            offsets.append(len(blob))
+        start = len(body)
+        body.extend(offsets.tobytes())
+        blob_start = len(body)
+        body.extend(blob)
+        _pad(body)
+        return start, blob_start
+
+    paths = [video_paths[video_id] for video_id in path_index]
+    paths_off, paths_blob_off = blob_section(paths)
+    words_off, words_blob_off = blob_section(words)
+    postings_off = len(body)
+    body.extend(posting_offsets.tobytes())
+    columns_off = len(body)
+    for column in (video_ids, starts, ends):
+        body.extend(column.tobytes())
+
+    base = HEADER.size
+    header = HEADER.pack(MAGIC, index_generation(conn), len(paths), len(words), len(video_ids),
+                         base + paths_off, base + paths_blob_off, base + words_off,
+                         base + words_blob_off, base + postings_off, base + columns_off)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, path)
+    logging.info(f"Woorden-database geschreven naar {path}: {len(words)} woorden, {len(video_ids)} voorkomens.")
+
+class WordDatabase:
+    """
+    Memory-mapped woorden-database. Alleen de postings van opgevraagde woorden
+    worden gedecodeerd; de rest van het bestand wordt nooit ingelezen.
+    """
+
+    def __init__(self, path):
+        self.file = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.generation, self.n_paths, self.n_words, self.n_postings,
+         paths_off, paths_blob_off, words_off, words_blob_off,
+         postings_off, columns_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is geen geldige woorden-database.")
+        view = memoryview(self._mm)
+        self._path_offsets = view[paths_off:paths_blob_off].cast('I')
+        self._paths_blob = paths_blob_off
+        self._word_offsets = view[words_off:words_off + 4 * (self.n_words + 1)].cast('I')
+        self._words_blob = words_blob_off
+        self._posting_offsets = view[postings_off:postings_off + 4 * (self.n_words + 1)].cast('I')
+        n = self.n_postings
+        self._video_ids = view[columns_off:columns_off + 4 * n].cast('I')
+        self._starts = view[columns_off + 4 * n:columns_off + 8 * n].cast('f')
+        self._ends = view[columns_off + 8 * n:columns_off + 12 * n].cast('f')
+        self._paths = {}
+
+    def __len__(self):
+        return self.n_words
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def _word_at(self, i):
+        start = self._words_blob + self._word_offsets[i]
+        end = self._words_blob + self._word_offsets[i + 1]
+        return self._mm[start:end]
+
+    def _find(self, word):
+        """Binair zoeken in de gesorteerde vocabulaire; geeft de woord-index of None."""
+        key = word.encode('utf-8')
+        lo, hi = 0, self.n_words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_words and self._word_at(lo) == key:
+            return lo
+        return None
+
+    def word(self, i):
+        """Het i-de woord van de gesorteerde vocabulaire."""
+        return self._word_at(i).decode('utf-8')
+
+    def words(self):
+        """De hele vocabulaire, gesorteerd. Decodeert alles, dus alleen voor wie hem echt nodig heeft."""
+        return [self.word(i) for i in range(self.n_words)]
+
+    def counts(self):
+        """Het aantal voorkomens per woord, in de volgorde van `words()`."""
+        import numpy as np
+        return np.diff(np.asarray(self._posting_offsets, dtype=np.int64))
+
+    def path(self, path_id):
+        if path_id not in self._paths:
+            start = self._paths_blob + self._path_offsets[path_id]
+            end = self._paths_blob + self._path_offsets[path_id + 1]
+            self._paths[path_id] = self._mm[start:end].decode('utf-8')
+        return self._paths[path_id]
+
+    def posting_range(self, word):
+        """(begin, eind) van de postings van een woord in de kolommen, of None."""
+        i = self._find(word)
+        if i is None:
+            return None
+        return self._posting_offsets[i], self._posting_offsets[i + 1]
+
+    def count(self, word):
+        span = self.posting_range(word)
+        return span[1] - span[0] if span else 0
+
+    def postings(self, word):
+        """
+        De kolommen (pad-id, start, eind) van een woord als NumPy-arrays. Het zijn kopieën,
+        zodat de mmap gesloten kan worden terwijl de arrays nog in gebruik zijn.
+        """
+        import numpy as np
+        lo, hi = self.posting_range(word) or (0, 0)
+        return (np.array(self._video_ids[lo:hi], dtype=np.uint32),
+                np.array(self._starts[lo:hi], dtype=np.float32),
+                np.array(self._ends[lo:hi], dtype=np.float32))
+
+    def clips(self, word):
+        """Alle voorkomens van een woord als clip-dicts, in transcriptie-volgorde."""
+        span = self.posting_range(word)
+        if span is None:
+            return []
+        return [{
+            'video_path': self.path(self._video_ids[i]),
+            # float32 terug naar de milliseconde-precisie van WhisperX.
+            'start_timestamp': round(self._starts[i], 3),
+            'end_timestamp': round(self._ends[i], 3),
+            'found_phrase': word
+        } for i in range(*span)]
+
+    def close(self):
+        for view in (self._path_offsets, self._word_offsets, self._posting_offsets,
+                     self._video_ids, self._starts, self._ends):
+            view.release()
+        self._mm.close()
+
+def _is_current(path, generation):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, file_generation, *_ = HEADER.unpack(header)
+    return magic == MAGIC and file_generation == generation
+
+@metrics.timed('woorden-database laden')
+def open_word_database(root_dir, path=None, jobs=None):
+    """
+    Opent de binaire woorden-database voor root_dir (standaard word_db_path(root_dir)).
+    Wordt opnieuw geschreven als de woorden-index sinds de vorige keer is veranderd;
+    de index zelf wordt bijgewerkt met `jobs` processen.
+    """
+    path = path or word_db_path(root_dir)
+    conn = open_index(root_dir, jobs)
+    if not _is_current(path, index_generation(conn)):
+        console.print("-> [yellow]Woorden-database wordt bijgewerkt vanuit de index...[/yellow]")
+        write_word_database(conn, path)
+    conn.close()
+    word_db = WordDatabase(path)
+    console.print(f"--> [bold green]✓ Database geladen met {len(word_db)} unieke woorden.[/bold green]")
+    return word_db
@@ -0,0 +1,100 @@
+# tests/test_downloader.py
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from downloader import download_video, read_archive, ARCHIVE_FILE
+
+YT_DLP = os.path.join(ROOT, 'vendor/yt-dlp/yt-dlp_linux')
+FEED_FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'feed.xml')
+EPISODES = ['ep1', 'ep2', 'ep3', 'ep4']
+# Genoeg voor yt-dlp: het kijkt alleen naar de Content-Type, niet naar de inhoud.
+FAKE_MP4 = b'\x00\x00\x00\x20ftypisom\x00\x00\x02\x00isomiso2avc1mp41' + b'\x00' * 4096
+
+class _Handler(SimpleHTTPRequestHandler):
+    """Serveert de site-map en onthoudt welke paden opgevraagd zijn."""
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+@unittest.skipUnless(os.access(YT_DLP, os.X_OK), "yt-dlp niet gevonden in vendor/")
+class DownloadArchiveTest(unittest.TestCase):
+    """download_video tegen een RSS-playlist op een lokale http.server."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.site = os.path.join(self.tmp, 'site')
+        self.output_dir = os.path.join(self.tmp, 'videos')
+        os.makedirs(self.site)
+
+        _Handler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_Handler, directory=self.site))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.feed_url = f"{self.base}/feed.xml"
+
+        with open(FEED_FIXTURE, 'r', encoding='utf-8') as f:
+            feed = f.read().replace('{base}', self.base)
+        with open(os.path.join(self.site, 'feed.xml'), 'w', encoding='utf-8') as f:
+            f.write(feed)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _publish(self, episode):
+        with open(os.path.join(self.site, f"{episode}.mp4"), 'wb') as f:
+            f.write(FAKE_MP4)
+
+    def _download(self):
+        _Handler.requests = []
+        ok = download_video(self.feed_url, self.output_dir, jobs=2, retries=0,
+                            yt_dlp=YT_DLP, cookies_from_browser=None)
+        fetched = sorted({path.lstrip('/')[:-len('.mp4')] for path in _Handler.requests if path.endswith('.mp4')})
+        return ok, fetched
+
+    def _archive(self):
+        return read_archive(os.path.join(self.output_dir, ARCHIVE_FILE))
+
+    def test_resume_downloads_only_missing_items(self):
+        for episode in ('ep1', 'ep2', 'ep4'):
+            self._publish(episode)
+
+        # Eerste run: ep3 geeft een 404, de rest komt binnen en in het archief.
+        ok, fetched = self._download()
+        self.assertFalse(ok)
+        self.assertEqual(fetched, ['ep1', 'ep2', 'ep3', 'ep4'])
+        self.assertEqual(len(self._archive()), 3)
+        self.assertFalse(any('ep3' in line for line in self._archive()))
+        for episode in ('ep1', 'ep2', 'ep4'):
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, episode, f"{episode}.mp4")))
+
+        # Tweede run: alleen het mislukte item wordt opnieuw opgehaald.
+        self._publish('ep3')
+        ok, fetched = self._download()
+        self.assertTrue(ok)
+        self.assertEqual(fetched, ['ep3'])
+        self.assertEqual(len(self._archive()), len(EPISODES))
+
+        # Derde run: alles staat in het archief, er gaat geen video meer over de lijn.
+        ok, fetched = self._download()
+        self.assertTrue(ok)
+        self.assertEqual(fetched, [])
+        self.assertEqual(len(self._archive()), len(EPISODES))
+
+if __name__ == '__main__':
+    unittest.main()